@@ -0,0 +1,60 @@
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+#### Modules that must only load when a stage needs them ####
+HEAVY = ['matplotlib', 'matplotlib.pyplot', 'sklearn', 'bs4']
+
+#### Import budgets in milliseconds; the package itself must stay near-instant ####
+BUDGETS = {
+    'healthcare': 50,
+    'healthcare.healthcare_expenditure_analysis': 2000,
+}
+
+PROBE = '''
+import sys, time, json
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{'seconds': elapsed, 'heavy': [m for m in {heavy!r} if m in sys.modules]}}))
+'''
+
+#### Each import runs in a fresh interpreter so nothing is already cached ####
+def measure(module, repeat):
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', PROBE.format(module = module, heavy = HEAVY)],
+                                cwd = ROOT, check = True, capture_output = True, text = True).stdout
+        runs.append(json.loads(output))
+    return {'module': module,
+            'median_ms': statistics.median(run['seconds'] for run in runs) * 1000,
+            'heavy_modules': sorted({m for run in runs for m in run['heavy']})}
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'Import time of the healthcare package and which heavy modules it loads')
+    parser.add_argument('--repeat', type = int, default = 5)
+    parser.add_argument('--json', help = 'write results to this file')
+    args = parser.parse_args(argv)
+
+    results, failed = [], False
+    for module, budget in BUDGETS.items():
+        result = measure(module, args.repeat)
+        result['budget_ms'] = budget
+        result['ok'] = result['median_ms'] <= budget and not result['heavy_modules']
+        failed |= not result['ok']
+        results.append(result)
+        print(f'{module:<45}{result["median_ms"]:>9.1f} ms  (budget {budget} ms)'
+              f'  heavy: {", ".join(result["heavy_modules"]) or "-"}  {"ok" if result["ok"] else "FAIL"}')
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent = 2)
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,97 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import resource
+import tracemalloc
+import subprocess
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+sys.path.insert(0, HERE)
+
+import fixtures
+
+#### Exact class strings the loaders used with BeautifulSoup ####
+TABLE_CLASSES = {
+    'expenditure': 'wikitable sortable static-row-numbers mw-datatable sticky-table-head sticky-table-col1 sort-under',
+    'life_expectancy': 'wikitable sortable mw-datatable sort-under sticky-table-head sticky-table-col1 static-row-numbers',
+    'disposable_income': 'sortable wikitable static-row-numbers sticky-table-head',
+    'obesity_rate': 'wikitable plainrowheaders sortable sticky-header sort-under',
+}
+
+def parse_soup(page, source):
+    from io import StringIO
+    import pandas as pd
+    from bs4 import BeautifulSoup
+    table = BeautifulSoup(page, 'html.parser').find('table', class_ = TABLE_CLASSES[source])
+    return pd.concat(pd.read_html(StringIO(str(table))))
+
+def parse_stream(page, source):
+    from healthcare.tables import extract_table
+    return extract_table(page, classes = TABLE_CLASSES[source])
+
+METHODS = {'soup': parse_soup, 'stream': parse_stream}
+
+#### One measurement per fresh process so peak RSS is not shared between runs ####
+def measure(method, source, path, repeat):
+    with open(path, encoding = 'utf-8') as f:
+        page = f.read()
+    parse = METHODS[method]
+    parse(page, source)
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parse(page, source)
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    parse(page, source)
+    python_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    rss_growth = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before
+
+    return {'method': method, 'source': source, 'page_bytes': len(page.encode('utf-8')),
+            'seconds': min(times), 'python_peak_bytes': python_peak, 'rss_growth_kb': rss_growth}
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'Per-page parse time and peak memory: BeautifulSoup + read_html vs streaming extraction')
+    parser.add_argument('--pages', help = 'directory of saved pages (fetch.save_pages); default builds synthetic fixtures')
+    parser.add_argument('--filler', type = int, default = 2000, help = 'paragraphs of filler around synthetic tables')
+    parser.add_argument('--repeat', type = int, default = 5)
+    parser.add_argument('--json', help = 'write results to this file')
+    parser.add_argument('--worker', nargs = 3, metavar = ('METHOD', 'SOURCE', 'PATH'), help = argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        print(json.dumps(measure(*args.worker, args.repeat)))
+        return
+
+    pages = args.pages
+    if pages is None:
+        pages = tempfile.mkdtemp(prefix = 'healthcare-pages-')
+        frame = fixtures.base_frame(os.path.join(HERE, '..', 'healthcare', 'healthcare.csv'))
+        fixtures.write_pages(pages, fixtures.build_pages(frame, filler = args.filler))
+
+    results = []
+    for source, title in fixtures.PAGE_TITLES.items():
+        path = os.path.join(pages, title + '.html')
+        for method in METHODS:
+            output = subprocess.run([sys.executable, __file__, '--repeat', str(args.repeat), '--worker', method, source, path],
+                                    check = True, capture_output = True, text = True).stdout
+            results.append(json.loads(output))
+
+    print(f'{"source":<18}{"method":<8}{"page KB":>9}{"ms":>9}{"py peak KB":>12}{"rss +KB":>9}')
+    for r in results:
+        print(f'{r["source"]:<18}{r["method"]:<8}{r["page_bytes"] / 1024:>9.0f}{r["seconds"] * 1000:>9.1f}'
+              f'{r["python_peak_bytes"] / 1024:>12.0f}{r["rss_growth_kb"]:>9}')
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent = 2)
+
+if __name__ == '__main__':
+    main()
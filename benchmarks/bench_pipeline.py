@@ -0,0 +1,186 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+import contextlib
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+sys.path.insert(0, HERE)
+
+import fixtures
+
+GOLDEN_CSV = os.path.join(HERE, '..', 'healthcare', 'healthcare.csv')
+
+STAGES = ['fetch', 'parse', 'clean', 'merge', 'fit', 'panel', 'render', 'export']
+
+#### Slowdowns smaller than this many milliseconds are noise, whatever the ratio ####
+NOISE_MS = 50
+
+@contextlib.contextmanager
+def timed(times, stage):
+    start = time.perf_counter()
+    yield
+    times[stage] = times.get(stage, 0.0) + time.perf_counter() - start
+
+#### One pass of every stage over the served pages, as the pipeline runs them ####
+def run_once(base_url, output_dir, skip, workers):
+    import healthcare.healthcare_expenditure_analysis as analysis
+    from healthcare.export import export_tables
+    from healthcare.fetch import fetch_pages
+    from healthcare.rendering import render_charts
+    from healthcare.sources import CORE_SOURCES, REGISTRY, clean, parse_page
+
+    sources = [REGISTRY[name] for name in CORE_SOURCES]
+    times = {}
+
+    with timed(times, 'fetch'):
+        pages = fetch_pages(base_url = base_url)
+    with timed(times, 'parse'):
+        raw = {source.name: parse_page(source, pages[source.name], analysis.YEAR) for source in sources}
+    with timed(times, 'clean'):
+        cleaned = {source.name: clean(source, raw[source.name]) for source in sources}
+        cleaned['expenditure'] = analysis.in_scope(cleaned['expenditure']).sort_values('Country')
+
+    with timed(times, 'merge'):
+        healthcare = analysis.combine_datasets(cleaned['expenditure'], cleaned['life_expectancy'])
+        with_income = analysis.add_disposable_income(healthcare, cleaned['disposable_income'])
+        with_obesity = analysis.add_obesity_rate(healthcare, cleaned['obesity_rate'])
+    with timed(times, 'fit'):
+        expenditure_trend = analysis.add_expenditure_trend(with_income)
+        life_expectancy_trend = analysis.add_life_expectancy_trend(with_obesity)
+    with timed(times, 'merge'):
+        results = analysis.combine_results(expenditure_trend, life_expectancy_trend)
+
+    if 'panel' not in skip:
+        with timed(times, 'panel'):
+            expenditure, income = REGISTRY['expenditure'], REGISTRY['disposable_income']
+            expenditure_panel = analysis.in_scope(clean(expenditure, parse_page(expenditure, pages['expenditure'], panel = True), panel = True))
+            income_panel = clean(income, parse_page(income, pages['disposable_income'], panel = True), panel = True)
+            analysis.combine_panel(expenditure_panel, cleaned['life_expectancy'], income_panel, cleaned['obesity_rate'])
+
+    if 'render' not in skip:
+        frames = {'healthcare': healthcare, 'with_income': with_income, 'expenditure_trend': expenditure_trend,
+                  'with_obesity': with_obesity, 'life_expectancy_trend': life_expectancy_trend, 'results': results}
+        with timed(times, 'render'):
+            render_charts([(chart, frames[source], None) for chart, source in analysis.CHARTS.items()], os.path.join(output_dir, 'charts'), workers = workers)
+
+    if 'export' not in skip:
+        with timed(times, 'export'):
+            export_tables({'healthcare': results}, output_dir, ('csv', 'parquet', 'jsonl'))
+
+    return times, results
+
+#### Same countries and values as the checked-in results, up to float32 storage ####
+def golden_check(results):
+    import pandas as pd
+    golden = pd.read_csv(GOLDEN_CSV, index_col = 0).reset_index(drop = True)
+    try:
+        pd.testing.assert_frame_equal(results[golden.columns].reset_index(drop = True), golden,
+                                      check_dtype = False, check_categorical = False, rtol = 1e-5, atol = 1e-5)
+    except AssertionError as e:
+        return False, str(e).splitlines()[0]
+    return True, None
+
+# One scale: build (or reuse saved) pages for `countries` countries and `years`
+# expenditure years, serve them, and time `repeat` full passes. The curated scale
+# (the golden 33 countries) also checks the results against healthcare.csv.
+def bench_scale(countries, years, repeat, skip, workers, pages_dir = None, filler = 200):
+    import healthcare.healthcare_expenditure_analysis as analysis
+    from healthcare.countries import register_countries
+    from healthcare.fetch import serve_pages
+
+    work = tempfile.mkdtemp(prefix = 'healthcare-bench-')
+    try:
+        golden = pages_dir is None and countries <= 33 and years == len(fixtures.EXPENDITURE_YEARS)
+        if pages_dir is None:
+            frame = fixtures.base_frame(GOLDEN_CSV, countries)
+            register_countries(list(frame['Country']))
+            pages_dir = fixtures.write_pages(os.path.join(work, 'pages'), fixtures.build_pages(frame, filler, fixtures.expenditure_years(years)))
+        analysis.configure(all_countries = not golden)
+
+        server, base_url = serve_pages(pages_dir)
+        runs = []
+        try:
+            for i in range(repeat):
+                output_dir = os.path.join(work, f'out-{i}')
+                times, results = run_once(base_url, output_dir, skip, workers)
+                runs.append(times)
+        finally:
+            server.shutdown()
+            analysis.configure(all_countries = False)
+
+        result = {
+            'countries': countries,
+            'years': years,
+            'rows': len(results),
+            'repeat': repeat,
+            'stages_ms': {stage: statistics.median(run[stage] for run in runs) * 1000 for stage in STAGES if stage in runs[0]},
+        }
+        result['total_ms'] = sum(result['stages_ms'].values())
+        if golden:
+            result['golden_ok'], result['golden_error'] = golden_check(results)
+        return result
+    finally:
+        shutil.rmtree(work, ignore_errors = True)
+
+#### Stages slower than threshold x their baseline time at the same scale ####
+def regressions(results, baseline, threshold):
+    previous = {(r['countries'], r['years']): r for r in baseline}
+    found = []
+    for result in results:
+        before = previous.get((result['countries'], result['years']))
+        if before is None:
+            continue
+        for stage, ms in result['stages_ms'].items():
+            base = before['stages_ms'].get(stage)
+            if base is not None and ms - base >= NOISE_MS and ms > threshold * base:
+                found.append({'countries': result['countries'], 'years': result['years'], 'stage': stage, 'baseline_ms': base, 'ms': ms})
+    return found
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'Offline per-stage timings of the whole pipeline over fixture pages served locally')
+    parser.add_argument('--countries', default = '33,1000', help = 'comma-separated scales; 33 is the golden curated set (default: %(default)s)')
+    parser.add_argument('--years', type = int, default = len(fixtures.EXPENDITURE_YEARS), help = 'expenditure year columns per page (default: %(default)s)')
+    parser.add_argument('--pages', help = 'directory of saved pages (fetch.save_pages) to replay instead of synthetic fixtures')
+    parser.add_argument('--filler', type = int, default = 200, help = 'paragraphs of filler around synthetic tables')
+    parser.add_argument('--repeat', type = int, default = 3)
+    parser.add_argument('--skip', action = 'append', default = [], choices = ['panel', 'render', 'export'], help = 'leave a stage out (repeatable)')
+    parser.add_argument('--workers', type = int, default = 1, help = 'chart rendering processes (default: %(default)s)')
+    parser.add_argument('--json', help = 'write results to this file')
+    parser.add_argument('--baseline', help = 'earlier --json output to compare against')
+    parser.add_argument('--threshold', type = float, default = 1.5, help = 'fail when a stage takes more than this multiple of its baseline (default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    import matplotlib
+    matplotlib.use('Agg')
+
+    scales = [33] if args.pages else [int(n) for n in args.countries.split(',')]
+    results = [bench_scale(n, args.years, args.repeat, set(args.skip), args.workers, args.pages, args.filler) for n in scales]
+
+    print(f'{"countries":>9}{"years":>6}' + ''.join(f'{stage:>9}' for stage in STAGES) + f'{"total ms":>10}  golden')
+    for r in results:
+        golden = {True: 'ok', False: 'FAIL', None: '-'}[r.get('golden_ok')]
+        print(f'{r["countries"]:>9}{r["years"]:>6}' + ''.join(f'{r["stages_ms"][stage]:>9.1f}' if stage in r['stages_ms'] else f'{"-":>9}' for stage in STAGES)
+              + f'{r["total_ms"]:>10.1f}  {golden}')
+        if r.get('golden_error'):
+            print(f'  golden mismatch: {r["golden_error"]}')
+
+    found = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = regressions(results, json.load(f)['results'], args.threshold)
+        for r in found:
+            print(f'REGRESSION {r["countries"]} countries / {r["years"]} years: {r["stage"]} {r["baseline_ms"]:.1f} -> {r["ms"]:.1f} ms')
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'results': results, 'threshold': args.threshold, 'regressions': found}, f, indent = 2)
+    return 1 if found or any(r.get('golden_ok') is False for r in results) else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,58 @@
+import os
+import sys
+import json
+import math
+import time
+import argparse
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+sys.path.insert(0, HERE)
+
+import fixtures
+
+GOLDEN_CSV = os.path.join(HERE, '..', 'healthcare', 'healthcare.csv')
+
+#### Golden (or scaled-up synthetic) inputs with the columns the sweep refits ####
+def sweep_frame(countries):
+    from healthcare.countries import country_codes
+    frame = fixtures.base_frame(GOLDEN_CSV, countries)
+    frame.insert(1, 'Code', country_codes(frame['Country']))
+    frame['Expenditure_As_Percent_of_Income'] = frame['Expenditure'] / frame['Disposable_Income'] * 100
+    return frame
+
+def bench(countries, leave_out, samples, workers, repeat):
+    from healthcare.sweeps import REGIONS, sensitivity_sweep
+    frame = sweep_frame(countries)
+    subsets = sum(math.comb(len(frame), k) for k in leave_out) + samples + 2 * len(REGIONS)
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        sensitivity_sweep(frame, leave_out = leave_out, samples = samples, workers = workers)
+        times.append(time.perf_counter() - start)
+    return {'countries': len(frame), 'leave_out': list(leave_out), 'samples': samples, 'workers': workers,
+            'subsets': subsets, 'seconds': min(times), 'subsets_per_second': subsets / min(times)}
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'Sensitivity sweep throughput: subsets refitted per second by scale and worker count')
+    parser.add_argument('--countries', default = '33,100', help = 'comma-separated scales; 33 is the golden curated set (default: %(default)s)')
+    parser.add_argument('--leave-out', default = '1,2,3', help = 'leave-out sizes (default: %(default)s)')
+    parser.add_argument('--samples', type = int, default = 10000, help = 'random subsets (default: %(default)s)')
+    parser.add_argument('--workers', default = '1', help = 'comma-separated worker counts (default: %(default)s)')
+    parser.add_argument('--repeat', type = int, default = 3)
+    parser.add_argument('--json', help = 'write results to this file')
+    args = parser.parse_args(argv)
+
+    leave_out = [int(k) for k in args.leave_out.split(',') if k.strip()]
+    results = [bench(int(n), leave_out, args.samples, int(w), args.repeat) for n in args.countries.split(',') for w in args.workers.split(',')]
+
+    print(f'{"countries":>9}{"workers":>8}{"subsets":>10}{"seconds":>9}{"subsets/s":>11}')
+    for r in results:
+        print(f'{r["countries"]:>9}{r["workers"]:>8}{r["subsets"]:>10}{r["seconds"]:>9.2f}{r["subsets_per_second"]:>11.0f}')
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'results': results}, f, indent = 2)
+
+if __name__ == '__main__':
+    main()
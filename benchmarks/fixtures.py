@@ -0,0 +1,123 @@
+import os
+import html
+import random
+
+import pandas as pd
+
+from healthcare.countries import country_table
+
+#### Page titles as served under /wiki/ (match fetch.SOURCES) ####
+PAGE_TITLES = {
+    'expenditure': 'List_of_countries_by_total_health_expenditure_per_capita',
+    'life_expectancy': 'List_of_countries_by_life_expectancy',
+    'disposable_income': 'Disposable_household_and_per_capita_income',
+    'obesity_rate': 'List_of_countries_by_obesity_rate',
+}
+
+EXPENDITURE_YEARS = [str(year) for year in range(2015, 2023)]
+
+#### Golden inputs, or synthetic values for the other known countries (then 'Synthland N') scaled up from them ####
+def base_frame(golden_csv, countries = None, seed = 0):
+    golden = pd.read_csv(golden_csv)[['Country', 'Expenditure', 'Life_Expectancy', 'Disposable_Income', 'Obesity_Rate']]
+    if countries is None or countries <= len(golden):
+        return golden
+    rng = random.Random(seed)
+    names = [name for name in country_table()['Country'] if name not in set(golden['Country'])]
+    extra = []
+    for i in range(countries - len(golden)):
+        row = golden.iloc[i % len(golden)]
+        extra.append({
+            'Country': names[i] if i < len(names) else f'Synthland {i + 1 - len(names)}',
+            'Expenditure': int(row['Expenditure'] * rng.uniform(0.8, 1.2)),
+            'Life_Expectancy': round(row['Life_Expectancy'] + rng.uniform(-2, 2), 2),
+            'Disposable_Income': int(row['Disposable_Income'] * rng.uniform(0.8, 1.2)) // 100 * 100,
+            'Obesity_Rate': round(min(60, max(1, row['Obesity_Rate'] + rng.uniform(-5, 5))), 2),
+        })
+    return pd.concat([golden, pd.DataFrame(extra)], ignore_index = True)
+
+def _cell(tag, text, **attrs):
+    attributes = ''.join(f' {k.rstrip("_")}="{v}"' for k, v in attrs.items())
+    return f'<{tag}{attributes}>{html.escape(str(text))}</{tag}>'
+
+def _filler(paragraphs):
+    text = 'Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod tempor incididunt ut labore. '
+    return ''.join(f'<p>{text * 8}<a href="/wiki/Link_{i}">link</a><sup class="reference">[{i}]</sup></p>' for i in range(paragraphs))
+
+def _decoy_table():
+    rows = ''.join(f'<tr><td>Region {i}</td><td>{i * 3}</td></tr>' for i in range(40))
+    return f'<table class="wikitable sortable"><tr><th>Region</th><th>Value</th></tr>{rows}</table>'
+
+def _page(title, table, filler):
+    return (f'<!DOCTYPE html><html><head><title>{title} - Wikipedia</title></head><body>'
+            f'<div id="content"><h1>{title}</h1>{_filler(filler)}{_decoy_table()}{table}{_filler(filler)}'
+            f'<div class="navbox">{_decoy_table()}</div></div></body></html>')
+
+#### The last `count` years up to 2022, as expenditure table headers ####
+def expenditure_years(count = len(EXPENDITURE_YEARS)):
+    return [str(year) for year in range(2023 - count, 2023)]
+
+def expenditure_page(frame, filler = 200, years = None):
+    columns = years or EXPENDITURE_YEARS
+    header = '<tr>' + _cell('th', 'Location') + ''.join(_cell('th', year) for year in columns) + '</tr>'
+    rows = []
+    for row in frame.itertuples():
+        values = [int(row.Expenditure * (0.7 + 0.3 * i / max(len(columns) - 1, 1))) for i in range(len(columns))]
+        rows.append('<tr>' + _cell('td', row.Country) + ''.join(_cell('td', value) for value in values) + '</tr>')
+    table = ('<table class="wikitable sortable static-row-numbers mw-datatable sticky-table-head sticky-table-col1 sort-under">'
+             f'<thead>{header}</thead><tbody>{"".join(rows)}</tbody></table>')
+    return _page('List of countries by total health expenditure per capita', table, filler)
+
+def life_expectancy_page(frame, filler = 200):
+    header = ('<tr>' + _cell('th', 'Countries and territories', rowspan = 2)
+              + ''.join(_cell('th', group, colspan = 2) for group in ('All', 'Male', 'Female')) + '</tr>'
+              + '<tr>' + ''.join(_cell('th', 'at birth') + _cell('th', 'at age 65') for _ in range(3)) + '</tr>')
+    rows = []
+    for row in frame.itertuples():
+        country = 'Czechia' if row.Country == 'Czech Republic' else row.Country
+        values = [row.Life_Expectancy, 20.1, round(row.Life_Expectancy - 2.5, 2), 18.3, round(row.Life_Expectancy + 2.5, 2), 21.9]
+        rows.append('<tr>' + _cell('td', country) + ''.join(_cell('td', value) for value in values) + '</tr>')
+    table = ('<table class="wikitable sortable mw-datatable sort-under sticky-table-head sticky-table-col1 static-row-numbers">'
+             f'<thead>{header}</thead><tbody>{"".join(rows)}</tbody></table>')
+    return _page('List of countries by life expectancy', table, filler)
+
+def disposable_income_page(frame, filler = 200):
+    header = ('<tr>' + _cell('th', 'Location')
+              + '<th>2022* (USD PPP)<sup class="reference">[1]</sup></th></tr>')
+    rows = []
+    for i, row in enumerate(frame.itertuples()):
+        income = f'{int(row.Disposable_Income):,}' + (' (2021)' if i % 7 == 3 else ' (2019)' if i % 11 == 5 else '')
+        rows.append('<tr>' + _cell('td', row.Country) + _cell('td', income) + '</tr>')
+    table = ('<table class="sortable wikitable static-row-numbers sticky-table-head">'
+             f'<tbody>{header}{"".join(rows)}</tbody></table>')
+    return _page('Disposable household and per capita income', table, filler)
+
+def obesity_rate_page(frame, filler = 200):
+    header = '<tr>' + _cell('th', 'Country') + _cell('th', 'Percentage of adults with obesity (BMI≥30)') + _cell('th', 'Rank') + '</tr>'
+    rows = [('<tr>' + _cell('th', row.Country, scope = 'row') + _cell('td', row.Obesity_Rate) + _cell('td', i + 1) + '</tr>')
+            for i, row in enumerate(frame.itertuples())]
+    rows.append('<tr>' + _cell('th', 'Nowhere Island', scope = 'row') + _cell('td', '—') + _cell('td', '—') + '</tr>')
+    table = ('<table class="wikitable plainrowheaders sortable sticky-header sort-under">'
+             f'<tbody>{header}{"".join(rows)}</tbody></table>')
+    return _page('List of countries by obesity rate', table, filler)
+
+PAGE_BUILDERS = {
+    'expenditure': expenditure_page,
+    'life_expectancy': life_expectancy_page,
+    'disposable_income': disposable_income_page,
+    'obesity_rate': obesity_rate_page,
+}
+
+#### Build the four source pages from a frame of inputs; `years` are the expenditure table's year columns ####
+def build_pages(frame, filler = 200, years = None):
+    pages = {name: build(frame, filler) for name, build in PAGE_BUILDERS.items()}
+    if years is not None:
+        pages['expenditure'] = expenditure_page(frame, filler, years)
+    return pages
+
+#### Write pages as <directory>/<page title>.html, the layout fetch.serve_pages expects ####
+def write_pages(directory, pages):
+    os.makedirs(directory, exist_ok = True)
+    for name, page in pages.items():
+        with open(os.path.join(directory, PAGE_TITLES[name] + '.html'), 'w', encoding = 'utf-8') as f:
+            f.write(page)
+    return directory
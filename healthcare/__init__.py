@@ -0,0 +1,65 @@
+import importlib
+
+# Public API, resolved on first access so `import healthcare` stays cheap and
+# pulls in pandas, lxml, pyplot or sklearn only when something needs them.
+_EXPORTS = {
+    'Countries': 'healthcare_expenditure_analysis',
+    'configure': 'healthcare_expenditure_analysis',
+    'build_pipeline': 'healthcare_expenditure_analysis',
+    'main': 'healthcare_expenditure_analysis',
+    'get_expenditure_by_country': 'healthcare_expenditure_analysis',
+    'get_life_expectancy_by_country': 'healthcare_expenditure_analysis',
+    'get_disposable_income_by_country': 'healthcare_expenditure_analysis',
+    'get_obesity_rate_by_country': 'healthcare_expenditure_analysis',
+    'get_expenditure_panel': 'healthcare_expenditure_analysis',
+    'get_disposable_income_panel': 'healthcare_expenditure_analysis',
+    'get_source': 'healthcare_expenditure_analysis',
+    'SOURCES': 'fetch',
+    'FetchError': 'fetch',
+    'fetch_page': 'fetch',
+    'fetch_pages': 'fetch',
+    'save_pages': 'fetch',
+    'serve_pages': 'fetch',
+    'ResponseCache': 'cache',
+    'SnapshotStore': 'snapshots',
+    'Pipeline': 'pipeline',
+    'extract_table': 'tables',
+    'fit_lines': 'regression',
+    'fit_columns': 'regression',
+    'screen_pairs': 'regression',
+    'fit_groups': 'regression',
+    'panel_metrics': 'panel',
+    'render_charts': 'rendering',
+    'place_labels': 'labels',
+    'draw_labels': 'labels',
+    'country_table': 'countries',
+    'country_codes': 'countries',
+    'canonicalize': 'countries',
+    'register_countries': 'countries',
+    'Tracer': 'tracing',
+    'traced': 'tracing',
+    'fit_model': 'models',
+    'coefficient_table': 'models',
+    'evaluate_covariate_sets': 'models',
+    'sensitivity_sweep': 'sweeps',
+    'Source': 'sources',
+    'REGISTRY': 'sources',
+    'register_source': 'sources',
+    'load_sources': 'sources',
+    'serve_results': 'service',
+    'SchemaError': 'schemas',
+    'validate': 'schemas',
+    'export_tables': 'export',
+}
+
+__all__ = sorted(_EXPORTS)
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    value = getattr(importlib.import_module(f'.{_EXPORTS[name]}', __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,4 @@
+from .healthcare_expenditure_analysis import main
+
+if __name__ == '__main__':
+    main()
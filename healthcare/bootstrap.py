@@ -0,0 +1,94 @@
+from statistics import NormalDist
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from .regression import fit_lines
+from .workers import run_tasks, seeded_chunks
+
+Intervals = namedtuple('Intervals', ['countries', 'coefficients'])
+
+DEFAULT_CHUNK = 2000
+
+##############################
+#### Resampled line fits #####
+##############################
+
+#### One chunk of pairs-bootstrap resamples, each row a full resample of the countries ####
+def _bootstrap_chunk(x, y, seed, size):
+    rng = np.random.default_rng(seed)
+    rows = rng.integers(0, len(x), size = (size, len(x)))
+    fit = fit_lines(x[rows].T, y[rows].T)
+    return fit.slope, fit.intercept
+
+#### Chunks are seeded from `seed` alone, so results do not depend on the worker count ####
+def bootstrap_coefficients(x, y, resamples = 10000, seed = 0, workers = None, chunk_size = DEFAULT_CHUNK):
+    results = run_tasks(_bootstrap_chunk, [(x, y, chunk_seed, size) for chunk_seed, size in seeded_chunks(resamples, chunk_size, seed)], workers)
+    return np.concatenate([slope for slope, _ in results]), np.concatenate([intercept for _, intercept in results])
+
+#### Every leave-one-out fit at once by removing each row from the full sums ####
+def leave_one_out_coefficients(x, y):
+    n = len(x)
+    sum_x, sum_y = x.sum() - x, y.sum() - y
+    sum_xx, sum_xy = (x * x).sum() - x * x, (x * y).sum() - x * y
+    with np.errstate(invalid = 'ignore', divide = 'ignore'):
+        slope = ((n - 1) * sum_xy - sum_x * sum_y) / ((n - 1) * sum_xx - sum_x ** 2)
+    return slope, (sum_y - slope * sum_x) / (n - 1)
+
+#### Jackknife interval: estimate +/- z * sqrt((n-1)/n * sum((theta_i - mean)^2)) ####
+def _jackknife(estimate, replicates, z):
+    n = replicates.shape[0]
+    spread = np.sqrt((n - 1) / n * ((replicates - replicates.mean(axis = 0)) ** 2).sum(axis = 0))
+    return estimate - z * spread, estimate + z * spread
+
+# Bootstrap (percentile) and leave-one-out (jackknife) intervals for the slope, the
+# intercept, the trend at every country's x and every country's residual from it.
+# `name` prefixes the per-country columns: <name>_CI_Low/High (bootstrap) and
+# <name>_LOO_Low/High (jackknife) for the residual, <trend>_CI_Low/High for the trend.
+def trend_intervals(frame, x, y, name, trend = None, resamples = 10000, seed = 0, confidence = 0.95, workers = None):
+    trend = trend or f'{y}_Trend'
+    present = frame[x].notna() & frame[y].notna()
+    xs = frame.loc[present, x].to_numpy(dtype = float)
+    ys = frame.loc[present, y].to_numpy(dtype = float)
+
+    fit = fit_lines(xs, ys)
+    slope, intercept = fit.slope, fit.intercept
+    tail = (1 - confidence) / 2 * 100
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+
+    boot_slope, boot_intercept = bootstrap_coefficients(xs, ys, resamples, seed, workers)
+    boot_trend = boot_intercept[:, None] + boot_slope[:, None] * xs
+    trend_low, trend_high = np.nanpercentile(boot_trend, [tail, 100 - tail], axis = 0)
+
+    loo_slope, loo_intercept = leave_one_out_coefficients(xs, ys)
+    loo_trend = loo_intercept[:, None] + loo_slope[:, None] * xs
+    loo_trend_low, loo_trend_high = _jackknife(intercept + slope * xs, loo_trend, z)
+
+    countries = pd.DataFrame(index = frame.index)
+    columns = {
+        f'{trend}_CI_Low': trend_low,
+        f'{trend}_CI_High': trend_high,
+        f'{name}_CI_Low': ys - trend_high,
+        f'{name}_CI_High': ys - trend_low,
+        f'{name}_LOO_Low': ys - loo_trend_high,
+        f'{name}_LOO_High': ys - loo_trend_low,
+    }
+    for column, values in columns.items():
+        countries[column] = np.nan
+        countries.loc[present, column] = values
+
+    coefficients = pd.DataFrame({
+        'fit': name,
+        'x': x,
+        'y': y,
+        'term': ['slope', 'intercept'],
+        'estimate': [slope, intercept],
+        'ci_low': np.nanpercentile(np.stack([boot_slope, boot_intercept]), tail, axis = 1),
+        'ci_high': np.nanpercentile(np.stack([boot_slope, boot_intercept]), 100 - tail, axis = 1),
+        'loo_low': [_jackknife(slope, loo_slope, z)[0], _jackknife(intercept, loo_intercept, z)[0]],
+        'loo_high': [_jackknife(slope, loo_slope, z)[1], _jackknife(intercept, loo_intercept, z)[1]],
+        'resamples': resamples,
+        'seed': seed,
+    })
+    return Intervals(countries, coefficients)
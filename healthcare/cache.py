@@ -0,0 +1,127 @@
+import os
+import json
+import time
+import hashlib
+import threading
+
+from .files import write_atomic
+
+DEFAULT_CACHE_DIR = os.environ.get('HEALTHCARE_CACHE_DIR') or os.path.join(os.path.expanduser('~'), '.cache', 'healthcare')
+
+#### Source pages change about weekly; within a day reuse them without asking ####
+DEFAULT_TTL = 24 * 60 * 60
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+def _listdir(directory):
+    try:
+        return os.listdir(directory)
+    except FileNotFoundError:
+        return []
+
+##############################
+####### Response cache #######
+##############################
+
+# One entry per URL: <key>.body holds the decoded page as UTF-8 and <key>.json its
+# validators (ETag/Last-Modified) and fetch time. The body's mtime is its last use,
+# which drives least-recently-used eviction once the cache grows past max_bytes.
+class ResponseCache:
+    def __init__(self, directory = None, ttl = DEFAULT_TTL, max_bytes = DEFAULT_MAX_BYTES, max_age = None, offline = False):
+        self.root = directory or DEFAULT_CACHE_DIR
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.offline = offline
+        self._lock = threading.Lock()
+
+    @property
+    def directory(self):
+        return os.path.join(self.root, 'http')
+
+    def _paths(self, url):
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, key + '.body'), os.path.join(self.directory, key + '.json')
+
+    def get(self, url):
+        body_path, meta_path = self._paths(url)
+        try:
+            with open(meta_path, encoding = 'utf-8') as f:
+                meta = json.load(f)
+            with open(body_path, 'rb') as f:
+                body = f.read().decode('utf-8')
+        except (FileNotFoundError, ValueError):
+            return None
+        meta['body'] = body
+        return meta
+
+    def is_fresh(self, entry):
+        return self.ttl is not None and time.time() - entry['fetched_at'] < self.ttl
+
+    #### Conditional GET headers for a stale entry ####
+    def validators(self, entry):
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def put(self, url, body, headers):
+        body_path, meta_path = self._paths(url)
+        meta = {
+            'url': url,
+            'etag': headers.get('ETag'),
+            'last_modified': headers.get('Last-Modified'),
+            'fetched_at': time.time(),
+        }
+        os.makedirs(self.directory, exist_ok = True)
+        write_atomic(body_path, body.encode('utf-8'))
+        write_atomic(meta_path, json.dumps(meta).encode('utf-8'))
+        self.prune()
+
+    #### 304 Not Modified: the stored body is good for another ttl ####
+    def revalidated(self, url, entry):
+        entry = {k: v for k, v in entry.items() if k != 'body'}
+        entry['fetched_at'] = time.time()
+        write_atomic(self._paths(url)[1], json.dumps(entry).encode('utf-8'))
+        self.touch(url)
+
+    def touch(self, url):
+        try:
+            os.utime(self._paths(url)[0])
+        except FileNotFoundError:
+            pass
+
+    #### Drop entries unused for max_age, then least recently used until under max_bytes ####
+    def prune(self):
+        with self._lock:
+            entries = []
+            for name in _listdir(self.directory):
+                if not name.endswith('.body'):
+                    continue
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+            entries.sort()
+
+            now = time.time()
+            total = sum(size for _, size, _ in entries)
+            for used_at, size, path in entries:
+                expired = self.max_age is not None and now - used_at > self.max_age
+                oversize = self.max_bytes is not None and total > self.max_bytes
+                if not (expired or oversize):
+                    continue
+                for stale in (path, path[:-len('.body')] + '.json'):
+                    try:
+                        os.remove(stale)
+                    except FileNotFoundError:
+                        pass
+                total -= size
+
+    def clear(self):
+        with self._lock:
+            for name in _listdir(self.directory):
+                os.remove(os.path.join(self.directory, name))
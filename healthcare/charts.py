@@ -0,0 +1,164 @@
+from collections import namedtuple
+
+import numpy as np
+from matplotlib.figure import Figure
+
+from .labels import draw_labels
+from .tracing import traced
+
+##############################
+########### Charts ###########
+##############################
+
+# Each chart draws into `fig` (a new, pyplot-free Figure by default) and returns it,
+# so batch rendering holds no global state and nothing stays open after saving.
+# Pass a pyplot figure (plt.figure()) to show a chart in a window instead.
+# `highlight` is any collection of country names drawn in the highlight colour.
+
+#### Countries drawn in the highlight colour unless a chart is given others ####
+HIGHLIGHT = ('United States',)
+
+COLOR = '#327ebd'
+HIGHLIGHT_COLOR = '#bd3232'
+TREND_COLOR = '#646464'
+
+#### A chart's columns as plain arrays, with the highlight mask, computed once ####
+Points = namedtuple('Points', ['x', 'y', 'names', 'highlight'])
+
+def points(healthcare, x, y, highlight = HIGHLIGHT):
+    names = healthcare['Country'].to_numpy(dtype = object)
+    return Points(healthcare[x].to_numpy(dtype = float), healthcare[y].to_numpy(dtype = float), names,
+                  np.isin(names, list(highlight or ())))
+
+#### The layout every chart shares: size, titles, spines and (for scatter charts) grid ####
+def figure(fig, title, xlabel, ylabel, grid = True):
+    fig = Figure() if fig is None else fig
+    ax = fig.subplots()
+    fig.set_figheight(16 * 0.75)
+    fig.set_figwidth(9 * 0.75)
+    ax.set_xlabel(xlabel, fontsize = 16)
+    ax.set_ylabel(ylabel, fontsize = 16)
+    fig.suptitle(title, fontsize = 20)
+    ax.set_title(' ')
+    fig.tight_layout()
+    if grid:
+        ax.grid(linestyle=':')
+    ax.spines['top'].set_visible(False)
+    ax.spines['right'].set_visible(False)
+    return fig, ax
+
+#### Saved cropped to what was drawn, as the notebook shows them, so long tick labels are not cut off ####
+def save_figure(fig, target, fmt, dpi = None):
+    fig.savefig(target, format = fmt, dpi = dpi, bbox_inches = 'tight')
+
+#### Two artists whatever the number of points: the rest, then the highlighted ones on top ####
+def scatter(ax, data):
+    ax.scatter(data.x[~data.highlight], data.y[~data.highlight], color = COLOR)
+    ax.scatter(data.x[data.highlight], data.y[data.highlight], color = HIGHLIGHT_COLOR)
+
+#### Sorted horizontal bars in one artist, coloured per bar ####
+def bars(ax, data):
+    ax.barh(data.names, data.x, color = np.where(data.highlight, HIGHLIGHT_COLOR, COLOR))
+
+def label_points(ax, data):
+    draw_labels(ax, data.x, data.y, data.names, alpha = 0.55)
+
+#### Bootstrap interval whiskers on a sorted bar chart, when resampling mode added them ####
+def error_bars(ax, healthcare, column):
+    if f'{column}_CI_Low' not in healthcare:
+        return
+    values = healthcare[column].values
+    below = values - healthcare[f'{column}_CI_Low'].values
+    above = healthcare[f'{column}_CI_High'].values - values
+    ax.errorbar(values, healthcare['Country'], xerr = [below, above], fmt = 'none', ecolor = TREND_COLOR, elinewidth = 1, capsize = 2)
+
+#### CHART: Life expenctancy vs health expenditure ####
+@traced('chart')
+def chart_life_expectancy_vs_health_expenditure(healthcare, fig = None, highlight = HIGHLIGHT):
+    data = points(healthcare, 'Expenditure', 'Life_Expectancy', highlight)
+    fig, ax = figure(fig, 'Life expenctancy vs health expenditure', 'Health Expenditure per capita', 'Life Expenctancy')
+    ax.set_xlim([1000, 13000])
+    ax.set_ylim([75, 85])
+    ax.xaxis.set_major_formatter('${x:,.0f}')
+    scatter(ax, data)
+    label_points(ax, data)
+    return fig
+
+#### CHART: Health expenditure by disposable income ####
+@traced('chart')
+def chart_expenditure_by_income(healthcare, fig = None, highlight = HIGHLIGHT):
+    data = points(healthcare, 'Expenditure_As_Percent_of_Income', 'Disposable_Income', highlight)
+    fig, ax = figure(fig, 'Health expenditure by disposable income', 'Health expenditure percent of disposable income', 'Disposable income')
+    ax.xaxis.set_major_formatter('{x:,.0f}%')
+    ax.yaxis.set_major_formatter('${x:,.0f}')
+    scatter(ax, data)
+    label_points(ax, data)
+    return fig
+
+#### CHART: Health expenditure percent by disposable income ####
+@traced('chart')
+def chart_expenditure_by_income_trend(healthcare, fig = None, highlight = HIGHLIGHT):
+    data = points(healthcare, 'Expenditure_As_Percent_of_Income', 'Disposable_Income', highlight)
+    fig, ax = figure(fig, 'Health expenditure percent by disposable income', 'Health expenditure percent of disposable income', 'Disposable income')
+    ax.xaxis.set_major_formatter('{x:,.0f}%')
+    ax.yaxis.set_major_formatter('${x:,.0f}')
+    scatter(ax, data)
+    ax.plot(healthcare['Expenditure_As_Percent_of_Income_Trend'].to_numpy(), data.y, color = TREND_COLOR)
+    label_points(ax, data)
+    return fig
+
+#### CHART: Excess expenditure (percent) of disposable income ####
+@traced('chart')
+def chart_excess_expenditure(healthcare, fig = None, highlight = HIGHLIGHT):
+    healthcare = healthcare.sort_values('Excess_Expenditure_as_Percent')
+    data = points(healthcare, 'Excess_Expenditure_as_Percent', 'Excess_Expenditure_as_Percent', highlight)
+    fig, ax = figure(fig, 'Excess expenditure (percent) of disposable income', 'Excess expenditure', 'Country', grid = False)
+    ax.xaxis.set_major_formatter('{x:,.0f}%')
+    bars(ax, data)
+    error_bars(ax, healthcare, 'Excess_Expenditure_as_Percent')
+    return fig
+
+#### CHART: Life expenctancy vs obesity rate ####
+@traced('chart')
+def chart_life_expectancy_vs_obesity_rate(healthcare, fig = None, highlight = HIGHLIGHT):
+    data = points(healthcare, 'Obesity_Rate', 'Life_Expectancy', highlight)
+    fig, ax = figure(fig, 'Life expenctancy vs obesity rate', 'Obesity rate', 'Life expenctancy')
+    ax.xaxis.set_major_formatter('{x:,.0f}%')
+    scatter(ax, data)
+    label_points(ax, data)
+    return fig
+
+#### CHART: Life expenctancy vs obesity rate ####
+@traced('chart')
+def chart_life_expectancy_vs_obesity_rate_trend(healthcare, fig = None, highlight = HIGHLIGHT):
+    data = points(healthcare, 'Obesity_Rate', 'Life_Expectancy', highlight)
+    fig, ax = figure(fig, 'Life expenctancy vs obesity rate', 'Obesity rate', 'Life expenctancy')
+    ax.xaxis.set_major_formatter('{x:,.0f}%')
+    scatter(ax, data)
+    ax.plot(data.x, healthcare['Life_Expectancy_Trend'].to_numpy(), color = TREND_COLOR)
+    label_points(ax, data)
+    return fig
+
+#### CHART: Years added ####
+@traced('chart')
+def chart_years_added(healthcare, fig = None, highlight = HIGHLIGHT):
+    healthcare = healthcare.sort_values('Years_Added')
+    data = points(healthcare, 'Years_Added', 'Years_Added', highlight)
+    fig, ax = figure(fig, 'Years added (adjusted for obesity rate)', 'Years Added', 'Country', grid = False)
+    ax.xaxis.set_major_formatter('{x:,.1f}%')
+    bars(ax, data)
+    error_bars(ax, healthcare, 'Years_Added')
+    return fig
+
+#### CHART: Excess disposable income by years added ####
+@traced('chart')
+def chart_excess_disposable_income_by_years_added(healthcare, fig = None, highlight = HIGHLIGHT):
+    data = points(healthcare, 'Years_Added', 'Excess_Disposable_Income', highlight)
+    fig, ax = figure(fig, 'Excess disposable income by years added', 'Years added', 'Excess disposable income')
+    ax.set_ylim([15000, 55000])
+    ax.xaxis.set_major_formatter('{x:,.0f}%')
+    ax.yaxis.set_major_formatter('${x:,.0f}')
+    scatter(ax, data)
+    ax.vlines(0, 15000, 55000, color = TREND_COLOR, alpha = 0.35)
+    label_points(ax, data)
+    return fig
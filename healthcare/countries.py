@@ -0,0 +1,152 @@
+import os
+import re
+import csv
+import functools
+import unicodedata
+
+import pandas as pd
+
+#### ISO 3166-1 numeric code, ISO-3 code, canonical name and ';'-separated aliases ####
+COUNTRIES_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'countries.csv')
+
+#### Regional and income-group rows some source tables carry; dropped without a report ####
+AGGREGATES = {
+    'world', 'oecd', 'oecd average', 'oecd total', 'european union', 'eu', 'euro area', 'eu27', 'g7', 'g20',
+    'africa', 'asia', 'europe', 'americas', 'oceania', 'north america', 'south america', 'latin america',
+    'latin america and caribbean', 'latin america and the caribbean', 'sub saharan africa', 'middle east',
+    'middle east and north africa', 'east asia and pacific', 'europe and central asia', 'south asia',
+    'high income', 'low income', 'middle income', 'upper middle income', 'lower middle income',
+}
+
+_FOOTNOTES = re.compile(r'\[[^\]]*\]|[*†‡]')
+_PARENTHESES = re.compile(r'\([^)]*\)')
+_PUNCTUATION = re.compile(r'[^a-z0-9]+')
+_SEPARATORS = re.compile(r'[^\w.]+')
+
+##############################
+####### Country index ########
+##############################
+
+# Lookup form of a name: footnote markers dropped, accents folded, lower case,
+# '&' as 'and', 'St.' as 'saint', punctuation as single spaces and no leading 'the'.
+# Punctuation becomes a space before the ASCII fold, which would otherwise delete
+# non-ASCII marks outright: 'Côte d’Ivoire' must read as 'cote d ivoire'.
+def normalize(name):
+    name = _FOOTNOTES.sub('', str(name)).replace('&', ' and ')
+    name = _SEPARATORS.sub(' ', name)
+    name = unicodedata.normalize('NFKD', name).encode('ascii', 'ignore').decode('ascii').lower()
+    name = re.sub(r'\bst\b\.?', 'saint', name)
+    name = _PUNCTUATION.sub(' ', name).strip()
+    return name[4:] if name.startswith('the ') else name
+
+#### Codes from here up are free for registered units (ISO numeric codes stop at 999) ####
+FIRST_EXTRA_CODE = 1000
+
+#### Rows added with register_countries, as csv-style dicts ####
+_extra = []
+
+#### code, ISO3, Country for every known country and territory, read once ####
+@functools.lru_cache(maxsize = None)
+def country_table():
+    with open(COUNTRIES_CSV, encoding = 'utf-8', newline = '') as f:
+        rows = list(csv.DictReader(f)) + _extra
+    return pd.DataFrame({
+        'Code': pd.array([int(row['code']) for row in rows], dtype = 'int32'),
+        'ISO3': [row['iso3'] for row in rows],
+        'Country': [row['name'] for row in rows],
+        'Aliases': [[alias for alias in row['aliases'].split(';') if alias] for row in rows],
+    })
+
+# Make more units joinable (sub-national regions, test fixtures...): each new name
+# gets the next free code from FIRST_EXTRA_CODE. Names already known keep theirs.
+# Returns the codes of all the names.
+def register_countries(names, aliases = None):
+    aliases = aliases or {}
+    known = country_codes(names)
+    new = list(dict.fromkeys(name for name, code in zip(names, known) if pd.isna(code)))
+    if new:
+        start = max(FIRST_EXTRA_CODE, int(country_table()['Code'].max()) + 1)
+        _extra.extend({'code': start + i, 'iso3': '', 'name': name, 'aliases': ';'.join(aliases.get(name, []))} for i, name in enumerate(new))
+        country_table.cache_clear()
+        _index.cache_clear()
+    return country_codes(names)
+
+#### Units added so far with register_countries; caches keyed on the index compare it ####
+def registered_count():
+    return len(_extra)
+
+#### Normalized name, alias or ISO-3 code -> country code ####
+@functools.lru_cache(maxsize = None)
+def _index():
+    index = {}
+    for row in country_table().itertuples():
+        for name in [row.Country, row.ISO3, *row.Aliases]:
+            if name:
+                index[normalize(name)] = row.Code
+    return index
+
+# Exact alias first. Failing that, a name with parenthesized qualifiers goes to the
+# entry whose name or alias holds all of its words with the fewest others, so
+# 'Guinea (Equatorial)' is Equatorial Guinea and 'Congo (Democratic Republic)' is
+# DR Congo; a tie between countries matches neither. With no such entry the
+# qualifier is dropped: 'France (metropolitan)' and 'Ireland (2019)' keep the bare name.
+def _lookup(name):
+    index = _index()
+    code = index.get(normalize(name))
+    if code is None and _PARENTHESES.search(str(name)):
+        bare = normalize(_PARENTHESES.sub('', str(name)))
+        words = set(normalize(str(name).replace('(', ' ').replace(')', ' ')).split())
+        fits = [(len(key.split()) - len(words), other) for key, other in index.items() if words <= set(key.split())]
+        if fits:
+            fewest = min(extra for extra, _ in fits)
+            codes = {other for extra, other in fits if extra == fewest}
+            return codes.pop() if len(codes) == 1 else None
+        code = index.get(bare)
+    return code
+
+#### Names matched only through their parenthesized qualifiers, not as written ####
+def approximate_matches(names):
+    index = _index()
+    return sorted({str(name) for name in pd.Series(names).dropna().unique() if normalize(name) not in index and _lookup(name) is not None})
+
+#### Country code for each name (<NA> if unknown); each distinct name is normalized once ####
+def country_codes(names):
+    names = pd.Series(names)
+    unique = names.dropna().unique()
+    codes = dict(zip(unique, (_lookup(name) for name in unique)))
+    return pd.array([codes.get(name) for name in names], dtype = 'Int32')
+
+def country_names(codes):
+    table = country_table()
+    return pd.Series(codes).map(dict(zip(table['Code'], table['Country']))).to_numpy()
+
+##############################
+######## Source frames #######
+##############################
+
+# Map a loaded source onto the index: Country becomes the canonical name and an
+# integer Code column follows it. Rows whose name matches nothing are dropped and
+# listed in frame.attrs['unmatched']; names matched only through their parenthesized
+# qualifiers (see _lookup) are kept and listed in frame.attrs['approximate'] as
+# 'name -> country'.
+# A country listed twice keeps its first row.
+def canonicalize(frame, column = 'Country'):
+    codes = country_codes(frame[column])
+    known = ~pd.isna(codes)
+    names = frame.loc[~known, column].dropna().astype(str)
+    unmatched = sorted({name for name in names if normalize(name) not in AGGREGATES})
+    approximate = [f'{name} -> {country_names(country_codes([name]))[0]}' for name in approximate_matches(frame.loc[known, column])]
+
+    frame = frame[known].copy()
+    frame[column] = country_names(codes[known])
+    frame.insert(frame.columns.get_loc(column) + 1, 'Code', codes[known].astype('int32'))
+    keys = ['Code', 'Year'] if 'Year' in frame else ['Code']
+    frame = frame.drop_duplicates(keys)
+    frame.attrs['unmatched'] = unmatched
+    frame.attrs['approximate'] = approximate
+    return frame
+
+#### Integer-key join of another source's columns onto `left` ####
+def join_countries(left, right, how = 'left'):
+    keys = ['Code', 'Year'] if 'Year' in left and 'Year' in right else ['Code']
+    return left.merge(right.drop(columns = 'Country', errors = 'ignore'), how = how, on = keys)
@@ -0,0 +1,113 @@
+import os
+import json
+import time
+import hashlib
+
+import pandas as pd
+
+from .files import atomic_path, locked
+from .fingerprints import hash_frame
+
+FORMATS = ('csv',)
+EXTENSIONS = {'csv': '.csv', 'parquet': '.parquet', 'jsonl': '.jsonl'}
+CHUNK_ROWS = 100000
+MANIFEST = 'manifest.json'
+
+##############################
+####### Chunked writers ######
+##############################
+
+def _chunks(frame, chunk_rows):
+    for start in range(0, len(frame), chunk_rows):
+        yield frame.iloc[start:start + chunk_rows]
+
+def _write_csv(frame, f, chunk_rows):
+    if not len(frame):
+        f.write(frame.to_csv(index = False).encode('utf-8'))
+    for i, chunk in enumerate(_chunks(frame, chunk_rows)):
+        f.write(chunk.to_csv(index = False, header = i == 0).encode('utf-8'))
+
+#### float32 values as their shortest decimal form (83.92, not 83.9199981689), like to_csv ####
+def json_ready(chunk):
+    narrow = [column for column, dtype in chunk.dtypes.items() if dtype == 'float32']
+    if not narrow:
+        return chunk
+    return chunk.assign(**{column: pd.to_numeric(chunk[column].astype(str)) for column in narrow})
+
+def _write_jsonl(frame, f, chunk_rows):
+    for chunk in _chunks(frame, chunk_rows):
+        f.write(json_ready(chunk).to_json(orient = 'records', lines = True, force_ascii = False).encode('utf-8'))
+
+#### One row group per chunk ####
+def _write_parquet(frame, f, chunk_rows):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    schema = pa.Schema.from_pandas(frame, preserve_index = False)
+    with pq.ParquetWriter(f, schema) as writer:
+        for chunk in _chunks(frame, chunk_rows):
+            writer.write_table(pa.Table.from_pandas(chunk, schema = schema, preserve_index = False))
+
+WRITERS = {'csv': _write_csv, 'parquet': _write_parquet, 'jsonl': _write_jsonl}
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+# Stream `frame` into a temporary file next to `path` and rename it into place once
+# complete, so a reader sees either the previous file or the whole new one.
+def write_table(frame, path, fmt, chunk_rows = CHUNK_ROWS):
+    with atomic_path(path) as tmp:
+        with open(tmp, 'wb') as f:
+            WRITERS[fmt](frame, f, chunk_rows)
+        digest = _sha256(tmp)
+    return {'format': fmt, 'rows': len(frame), 'columns': [str(column) for column in frame.columns], 'bytes': os.path.getsize(path), 'sha256': digest}
+
+##############################
+########## Manifest ##########
+##############################
+
+def read_manifest(directory):
+    try:
+        with open(os.path.join(directory, MANIFEST), encoding = 'utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {'outputs': {}}
+
+# Write each {name: frame} as <name>.<ext> in every format, then update manifest.json
+# (itself written atomically, last) with rows, columns, size and sha256 per file.
+# data_hash fingerprints the frame itself: a file whose frame and bytes are unchanged
+# since the manifest was written is left alone, so its mtime and hash stay put and
+# downstream jobs comparing hashes can skip it. Several exports may share a directory
+# (the pipeline runs them in parallel), so the manifest is re-read under a lock and
+# only this call's entries are merged into it. Returns the updated manifest.
+def export_tables(tables, directory, formats = FORMATS, chunk_rows = CHUNK_ROWS):
+    unknown = [fmt for fmt in formats if fmt not in WRITERS]
+    if unknown:
+        raise ValueError(f'unknown export format(s) {unknown} (choose from {sorted(WRITERS)})')
+    os.makedirs(directory, exist_ok = True)
+    previous_outputs = read_manifest(directory).get('outputs', {})
+
+    written = {}
+    for name, frame in tables.items():
+        data_hash = hash_frame(frame)
+        for fmt in formats:
+            filename = name + EXTENSIONS[fmt]
+            path = os.path.join(directory, filename)
+            previous = previous_outputs.get(filename)
+            if previous and previous.get('data_hash') == data_hash and os.path.exists(path) and _sha256(path) == previous.get('sha256'):
+                written[filename] = previous
+                continue
+            written[filename] = dict(write_table(frame, path, fmt, chunk_rows), data_hash = data_hash, written_at = time.time())
+
+    path = os.path.join(directory, MANIFEST)
+    with locked(path):
+        outputs = dict(read_manifest(directory).get('outputs', {}), **written)
+        outputs = {name: entry for name, entry in outputs.items() if os.path.exists(os.path.join(directory, name))}
+        manifest = {'outputs': dict(sorted(outputs.items())), 'updated_at': time.time()}
+        with atomic_path(path) as tmp:
+            with open(tmp, 'w', encoding = 'utf-8') as f:
+                json.dump(manifest, f, indent = 2)
+    return manifest
@@ -0,0 +1,149 @@
+import os
+import time
+import threading
+import http.server
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .tracing import traced
+
+##############################
+######## Source pages ########
+##############################
+
+SOURCES = {
+    'expenditure': 'https://en.wikipedia.org/wiki/List_of_countries_by_total_health_expenditure_per_capita',
+    'life_expectancy': 'https://en.wikipedia.org/wiki/List_of_countries_by_life_expectancy',
+    'disposable_income': 'https://en.wikipedia.org/wiki/Disposable_household_and_per_capita_income',
+    'obesity_rate': 'https://en.wikipedia.org/wiki/List_of_countries_by_obesity_rate',
+}
+
+USER_AGENT = 'healthcare-expenditure-analysis/1.0 (+https://github.com/OneThirtySeven/videos)'
+
+#### (connect, read) timeout in seconds, per source unless overridden ####
+DEFAULT_TIMEOUT = (5, 30)
+DEFAULT_RETRIES = 3
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+class FetchError(RuntimeError):
+    pass
+
+#### Shared pooled session ####
+_session = None
+_session_lock = threading.Lock()
+
+def make_session(pool_size = 8):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections = pool_size, pool_maxsize = pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers['User-Agent'] = USER_AGENT
+    return session
+
+def shared_session():
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = make_session()
+        return _session
+
+#### Point a source URL at another host, e.g. a local stand-in server ####
+def rebase_url(url, base_url):
+    if base_url is None:
+        return url
+    base = urllib.parse.urlsplit(base_url)
+    parts = urllib.parse.urlsplit(url)
+    return urllib.parse.urlunsplit((base.scheme, base.netloc, base.path.rstrip('/') + parts.path, parts.query, parts.fragment))
+
+#### Fetch one page, retrying connection errors, timeouts and 429/5xx ####
+@traced('fetch')
+def fetch_page(url, session = None, timeout = DEFAULT_TIMEOUT, retries = DEFAULT_RETRIES, backoff = 0.5, cache = None):
+    entry = cache.get(url) if cache is not None else None
+    if entry is not None and (cache.offline or cache.is_fresh(entry)):
+        cache.touch(url)
+        return entry['body']
+    if cache is not None and cache.offline:
+        raise FetchError(f'{url}: not in cache and running offline')
+
+    session = session or shared_session()
+    headers = cache.validators(entry) if entry is not None else {}
+    for attempt in range(retries + 1):
+        try:
+            response = session.get(url, timeout = timeout, headers = headers)
+            if response.status_code == 304 and entry is not None:
+                cache.revalidated(url, entry)
+                return entry['body']
+            if response.status_code not in RETRY_STATUS:
+                response.raise_for_status()
+                if cache is not None:
+                    cache.put(url, response.text, response.headers)
+                return response.text
+            error = FetchError(f'{url}: HTTP {response.status_code}')
+        except (requests.ConnectionError, requests.Timeout) as e:
+            error = e
+        except requests.HTTPError as e:
+            raise FetchError(str(e)) from e
+        if attempt < retries:
+            time.sleep(backoff * 2 ** attempt)
+    raise FetchError(f'{url}: giving up after {retries + 1} attempts') from error
+
+#### Fetch every source at once; wall-clock time is set by the slowest page. retries: one count, or {name: count} like timeouts ####
+def fetch_pages(sources = None, base_url = None, timeouts = None, retries = DEFAULT_RETRIES, session = None, max_workers = None, cache = None):
+    sources = SOURCES if sources is None else sources
+    timeouts = timeouts or {}
+    retries = retries if isinstance(retries, dict) else dict.fromkeys(sources, retries)
+    session = session or shared_session()
+
+    with ThreadPoolExecutor(max_workers = max_workers or len(sources) or 1) as pool:
+        futures = {
+            name: pool.submit(fetch_page, rebase_url(url, base_url), session, timeouts.get(name, DEFAULT_TIMEOUT), retries.get(name, DEFAULT_RETRIES), cache = cache)
+            for name, url in sources.items()
+        }
+
+    pages, errors = {}, {}
+    for name, future in futures.items():
+        try:
+            pages[name] = future.result()
+        except FetchError as e:
+            errors[name] = e
+    if errors:
+        raise FetchError('failed to fetch: ' + ', '.join(f'{name} ({e})' for name, e in errors.items()))
+    return pages
+
+##############################
+##### Local stand-in host ####
+##############################
+
+#### Save copies of the source pages as <directory>/<page title>.html ####
+def save_pages(directory, sources = None, **kwargs):
+    sources = SOURCES if sources is None else sources
+    os.makedirs(directory, exist_ok = True)
+    pages = fetch_pages(sources, **kwargs)
+    for name, url in sources.items():
+        path = os.path.join(directory, _page_filename(url))
+        with open(path, 'w', encoding = 'utf-8') as f:
+            f.write(pages[name])
+    return pages
+
+def _page_filename(url):
+    return urllib.parse.unquote(urllib.parse.urlsplit(url).path.rsplit('/', 1)[-1]) + '.html'
+
+class _PageHandler(http.server.SimpleHTTPRequestHandler):
+    extensions_map = {'.html': 'text/html; charset=utf-8'}
+
+    def translate_path(self, path):
+        return os.path.join(self.directory, _page_filename(path))
+
+    def log_message(self, format, *args):
+        pass
+
+#### Serve saved pages over HTTP so fetch_pages(base_url = ...) runs offline ####
+def serve_pages(directory, host = '127.0.0.1', port = 0):
+    handler = lambda *args, **kwargs: _PageHandler(*args, directory = directory, **kwargs)
+    server = http.server.ThreadingHTTPServer((host, port), handler)
+    thread = threading.Thread(target = server.serve_forever, daemon = True)
+    thread.start()
+    return server, f'http://{host}:{server.server_address[1]}'
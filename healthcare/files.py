@@ -0,0 +1,63 @@
+import os
+import glob
+import threading
+import functools
+import contextlib
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+##############################
+######## Atomic writes #######
+##############################
+
+# Yields a temporary name next to `path` for the caller to write, then renames it
+# over `path`, so readers see either the previous file or the whole new one. The
+# name is unique per process and thread; on error the partial file is removed.
+@contextlib.contextmanager
+def atomic_path(path):
+    tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    try:
+        yield tmp
+        os.replace(tmp, path)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(tmp)
+        raise
+
+def write_atomic(path, data):
+    with atomic_path(path) as tmp:
+        with open(tmp, 'wb') as f:
+            f.write(data)
+
+#### Remove every file matching pattern but keep (and other writers' temporary files) ####
+def remove_stale(pattern, keep):
+    for stale in glob.glob(pattern):
+        if stale != keep and not stale.endswith('.tmp'):
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(stale)
+
+##############################
+########### Locking ##########
+##############################
+
+_locks_lock = threading.Lock()
+
+#### One lock per path, made once (under _locks_lock) and kept ####
+@functools.lru_cache(maxsize = None)
+def _path_lock(path):
+    return threading.Lock()
+
+# Exclusive hold on `path` for a read-modify-write: a lock per path for the threads
+# of this process, plus an flock on <path>.lock for other processes where the
+# platform has fcntl.
+@contextlib.contextmanager
+def locked(path):
+    with _locks_lock:
+        lock = _path_lock(os.path.abspath(path))
+    with lock, open(f'{path}.lock', 'a') as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        yield
@@ -0,0 +1,177 @@
+import os
+import re
+import ast
+import dis
+import pickle
+import inspect
+import hashlib
+import functools
+import dataclasses
+
+import pandas as pd
+
+#### Content hashes used to key caches and detect changed inputs ####
+
+def hash_text(*parts):
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode('utf-8') if isinstance(part, str) else part)
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+#### A function's source, so edits to cleaning or formula code change the hash ####
+def hash_function(func):
+    try:
+        source = inspect.getsource(func)
+    except (OSError, TypeError):
+        source = func.__code__.co_code
+    return hash_text(func.__module__ or '', func.__qualname__, source)
+
+#### A whole module's source, for code a function reaches through helpers ####
+def hash_module(module):
+    return hash_text(module.__name__, inspect.getsource(module))
+
+PACKAGE = __name__.rpartition('.')[0]
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def _in_package(module):
+    return module == PACKAGE or (module or '').startswith(PACKAGE + '.')
+
+#### Every global or attribute name a code object (or any function nested in it) uses ####
+def _code_names(code):
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if inspect.iscode(const):
+            names |= _code_names(const)
+    return names
+
+#### Package modules a code object imports in its body, e.g. a deferred `from . import charts` ####
+def _deferred_imports(code):
+    modules, current = set(), None
+    for instruction in dis.get_instructions(code):
+        if instruction.opname == 'IMPORT_NAME':
+            current = instruction.argval
+            modules.add(current)
+        elif instruction.opname == 'IMPORT_FROM' and current == '':
+            modules.add(instruction.argval)
+    for const in code.co_consts:
+        if inspect.iscode(const):
+            modules |= _deferred_imports(const)
+    return {module for module in modules if module and os.path.isfile(os.path.join(PACKAGE_DIR, f'{module}.py'))}
+
+# A module's file and those of the package modules it imports, by bytes. Deferred
+# imports are usually not loaded when a stage is declared, and loading them (pyplot)
+# just to hash them would cost more than the stage saves, so they count whole.
+def _module_files(module):
+    hashes, pending = {}, [module]
+    while pending:
+        module = pending.pop()
+        if module in hashes:
+            continue
+        with open(os.path.join(PACKAGE_DIR, f'{module}.py'), 'rb') as f:
+            source = f.read()
+        hashes[module] = hash_text(source)
+        for node in ast.walk(ast.parse(source)):
+            if isinstance(node, ast.ImportFrom) and node.level == 1:
+                pending += [name for name in ([node.module] if node.module else [alias.name for alias in node.names])
+                            if os.path.isfile(os.path.join(PACKAGE_DIR, f'{name}.py'))]
+    return ', '.join(f'{module}:{digest}' for module, digest in sorted(hashes.items()))
+
+# A stable description of a value a function reads, queueing the package functions
+# and classes it holds onto `reached`. Module constants count by value, a string
+# naming a file in the package by that file's bytes, decorated functions (traced,
+# lru_cache) as the function they wrap, anything else by its type.
+def _describe(value, reached):
+    if callable(value) and hasattr(value, '__wrapped__'):
+        value = inspect.unwrap(value)
+    if isinstance(value, (str, bytes, int, float, complex, bool, type(None), re.Pattern)):
+        if isinstance(value, str) and value.startswith(PACKAGE_DIR + os.sep) and os.path.isfile(value):
+            with open(value, 'rb') as f:
+                return f'{value!r}:{hash_text(f.read())}'
+        return repr(value)
+    if isinstance(value, functools.partial):
+        return f'partial({_describe(value.func, reached)}, {_describe(value.args, reached)}, {_describe(value.keywords, reached)})'
+    if isinstance(value, (tuple, list)):
+        return f"{type(value).__qualname__}({', '.join(_describe(item, reached) for item in value)})"
+    if isinstance(value, dict):
+        return '{' + ', '.join(f'{_describe(k, reached)}: {_describe(v, reached)}' for k, v in value.items()) + '}'
+    if isinstance(value, (set, frozenset)):
+        return '{' + ', '.join(sorted(_describe(item, reached) for item in value)) + '}'
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return _describe(type(value), reached) + _describe({f.name: getattr(value, f.name) for f in dataclasses.fields(value)}, reached)
+    if inspect.ismodule(value):
+        return f'module {value.__name__}'
+    if inspect.isfunction(value) or inspect.isclass(value):
+        if _in_package(value.__module__):
+            reached.append(value)
+        return f'{value.__module__}.{value.__qualname__}'
+    if callable(value):
+        return f"{getattr(value, '__module__', None)}.{getattr(value, '__qualname__', type(value).__qualname__)}"
+    if _in_package(type(value).__module__):
+        reached.append(type(value))
+    return f'<{type(value).__module__}.{type(value).__qualname__}>'
+
+# The text hashed for one package function or class: its source plus what its names
+# resolve to through func.__globals__ (and `module.name` for package modules), its
+# closure cells, defaults and deferred imports. Package code it uses goes onto `reached`.
+def _code_part(obj, reached):
+    if inspect.isclass(obj):
+        for value in vars(obj).values():
+            value = getattr(value, '__func__', value)
+            if isinstance(value, property):
+                reached.extend(f for f in (value.fget, value.fset, value.fdel) if f is not None)
+            elif inspect.isfunction(value):
+                reached.append(value)
+        reached.extend(base for base in obj.__bases__ if _in_package(base.__module__))
+        try:
+            return inspect.getsource(obj)
+        except (OSError, TypeError):
+            #### Classes built by a factory (namedtuple) have no source of their own ####
+            return _describe({name: value for name, value in vars(obj).items() if not name.startswith('__')}, reached)
+
+    names = _code_names(obj.__code__)
+    lines = [hash_function(obj)]
+    for name in sorted(names):
+        if name not in obj.__globals__:
+            continue
+        value = obj.__globals__[name]
+        if inspect.ismodule(value) and _in_package(value.__name__):
+            lines += [f'{value.__name__}.{attr} = {_describe(getattr(value, attr), reached)}' for attr in sorted(names) if hasattr(value, attr)]
+        else:
+            lines.append(f'{name} = {_describe(value, reached)}')
+    lines += [_describe(cell.cell_contents, reached) for cell in obj.__closure__ or ()]
+    lines += [_describe(obj.__defaults__, reached), _describe(obj.__kwdefaults__, reached)]
+    lines += [f'import {module}: {_module_files(module)}' for module in sorted(_deferred_imports(obj.__code__))]
+    return '\n'.join(lines)
+
+# What a stage's output depends on in code: the function and every function, class,
+# constant and data file of this package it reaches by name, transitively. Helpers
+# in other modules (fits, joins, models) count; modules it never reaches (charts,
+# the service) do not, so an edit re-runs only the stages that use the edited code.
+def hash_code(func):
+    parts, seen, reached = {}, set(), [func]
+    while reached:
+        obj = reached.pop()
+        obj = inspect.unwrap(obj) if inspect.isfunction(obj) else obj
+        if not (inspect.isfunction(obj) or inspect.isclass(obj)) or not _in_package(obj.__module__):
+            continue
+        key = (obj.__module__, obj.__qualname__)
+        if key not in seen:
+            seen.add(key)
+            parts[key] = _code_part(obj, reached)
+    return hash_text(*(part for key in sorted(parts) for part in (*key, parts[key])))
+
+def hash_frame(frame):
+    values = pd.util.hash_pandas_object(frame, index = True).values
+    return hash_text(','.join(map(str, frame.columns)), ','.join(map(str, frame.dtypes)), values.tobytes())
+
+#### Any stage output; None when the value cannot be hashed (e.g. figures) ####
+def hash_value(value):
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return hash_frame(value.to_frame() if isinstance(value, pd.Series) else value)
+    if isinstance(value, (str, bytes)):
+        return hash_text(value)
+    try:
+        return hash_text(pickle.dumps(value, protocol = 4))
+    except Exception:
+        return None
@@ -1,539 +1,426 @@
-
 # %%
-import requests
+import os
+import sys
+import argparse
+
 import pandas as pd
-import matplotlib.pyplot as plt
-from bs4 import BeautifulSoup
-from sklearn.linear_model import LinearRegression
+
+from .bootstrap import trend_intervals
+from .cache import ResponseCache
+from .countries import country_codes, join_countries
+from .export import FORMATS as EXPORT_FORMATS, export_tables
+from .models import fit_model, coefficient_table, evaluate_covariate_sets
+from .panel import build_panel, panel_metrics, export_panel
+from .pipeline import Pipeline, PipelineError
+from .regression import fit_lines
+from .rendering import FORMATS, render_charts, report
+from .snapshots import SnapshotStore
+from .sources import REGISTRY, CORE_SOURCES, load_source, load_registry
+from .sweeps import DEFAULT_LEAVE_OUT, DEFAULT_SAMPLES, DEFAULT_FRACTION, sensitivity_sweep
+from .tracing import Tracer, traced, tracing, summary_table, write_report
 
 ##############################
 ###### Helper Functions ######
 ##############################
 
+#### Source page cache; HEALTHCARE_OFFLINE=1 never touches the network ####
+page_cache = ResponseCache(offline = os.environ.get('HEALTHCARE_OFFLINE') == '1')
+
+#### Cleaned source tables, keyed by page content and parser code ####
+snapshot_store = SnapshotStore()
+
+#### Where sources are fetched from (None: Wikipedia) and results written ####
+base_url = None
+output_dir = '.'
+
+def configure(cache_dir = None, offline = None, source_base_url = None, results_dir = None, all_countries = None):
+    global base_url, output_dir, scope
+    if cache_dir is not None:
+        page_cache.root = snapshot_store.root = cache_dir
+    if offline is not None:
+        page_cache.offline = offline
+    if source_base_url is not None:
+        base_url = source_base_url
+    if results_dir is not None:
+        output_dir = results_dir
+    if all_countries is not None:
+        scope = None if all_countries else Countries
+
 #### Countries with no NaNs ####
 Countries = ['Australia', 'Austria', 'Belgium', 'Canada', 'Chile', 'Costa Rica', 'Denmark', 'Estonia', 'Finland', 'France', 'Germany', 'Greece', 'Hungary', 'Ireland', 'Italy', 'Japan', 'Latvia', 'Lithuania', 'Luxembourg', 'Mexico', 'Netherlands', 'New Zealand', 'Norway', 'Poland', 'Portugal', 'Slovakia', 'Slovenia', 'South Korea', 'Spain', 'Sweden', 'Switzerland', 'United Kingdom', 'United States']
 
-#### DATA: Expenditure_by_country ####
-def get_expenditure_by_country():
-    page = requests.get('https://en.wikipedia.org/wiki/List_of_countries_by_total_health_expenditure_per_capita').text
-    soup = BeautifulSoup(page, 'html.parser')
-    table = soup.find('table', class_="wikitable sortable static-row-numbers mw-datatable sticky-table-head sticky-table-col1 sort-under")
-    expenditure_by_country = pd.read_html(str(table))
-    expenditure_by_country = pd.concat(expenditure_by_country)
-
-    expenditure_by_country = expenditure_by_country[['Location', '2022']]
-    expenditure_by_country = expenditure_by_country.rename(columns = {'Location':'Country', '2022':'Expenditure'})
+#### Year of the single-year analysis ####
+YEAR = 2022
 
-    expenditure_by_country.to_csv("expenditure_by_country.csv", index=False)
-    expenditure_by_country = expenditure_by_country[expenditure_by_country['Country'].isin(Countries)]
+#### Countries the analysis covers; None: every country in the sources ####
+scope = Countries
 
-    expenditure_by_country = expenditure_by_country.sort_values('Country')
-    
-    return expenditure_by_country
+def in_scope(frame):
+    if scope is None:
+        return frame
+    return frame[frame['Code'].isin(country_codes(scope))]
 
-#### DATA: Life_Expectancy ####
-def get_life_expectancy_by_country():
-    page = requests.get('https://en.wikipedia.org/wiki/List_of_countries_by_life_expectancy').text
-    soup = BeautifulSoup(page, 'html.parser')
-    table = soup.find('table', class_="wikitable sortable mw-datatable sort-under sticky-table-head sticky-table-col1 static-row-numbers")
-
-    life_expectancy_by_country = pd.read_html(str(table))
-    life_expectancy_by_country = pd.concat(life_expectancy_by_country)
+#### One registered source through the page cache and snapshot store (see sources.py); traced by its callers ####
+def get_source(name, page = None, panel = False):
+    return load_source(REGISTRY[name], page, YEAR, panel, cache = page_cache, base_url = base_url, store = snapshot_store)
 
-    life_expectancy_by_country = life_expectancy_by_country.iloc[ : , 0:2].droplevel(0, axis = 1)
-    life_expectancy_by_country = life_expectancy_by_country.rename(columns = {'Countries and territories':'Country', 'at birth':'Life_Expectancy'})
-    life_expectancy_by_country['Country'].values[life_expectancy_by_country['Country'] == 'Czechia'] = 'Czech Republic'
+#### DATA: Expenditure_by_country ####
+@traced('loader')
+def get_expenditure_by_country(page = None):
+    return in_scope(get_source('expenditure', page)).sort_values('Country')
 
-    return life_expectancy_by_country
+#### DATA: Life_Expectancy ####
+@traced('loader')
+def get_life_expectancy_by_country(page = None):
+    return get_source('life_expectancy', page)
 
 #### DATA: Disposable_Income ####
-def get_disposable_income_by_country():
-    page = requests.get('https://en.wikipedia.org/wiki/Disposable_household_and_per_capita_income').text
-    soup = BeautifulSoup(page, 'html.parser')
-    table = soup.find('table', class_="sortable wikitable static-row-numbers sticky-table-head")
+@traced('loader')
+def get_disposable_income_by_country(page = None):
+    return get_source('disposable_income', page)
 
-    income = pd.read_html(str(table))
-    income = pd.concat(income)
+#### DATA: Obesity_Rate ####
+@traced('loader')
+def get_obesity_rate_by_country(page = None):
+    return get_source('obesity_rate', page)
 
-    income = income.rename(columns = {'Location':'Country', '2022* (USD PPP)[1]':'Disposable_Income'})
-    income['Disposable_Income'] = income['Disposable_Income'].str.replace(' (2021)', '')
-    income['Disposable_Income'] = income['Disposable_Income'].str.replace(' (2019)', '')
-    income['Disposable_Income'] = income['Disposable_Income'].str.replace(',', '')
-    income['Disposable_Income'] = pd.to_numeric(income['Disposable_Income'])
+#### PANEL: every year column of a source, as Country, Year, value rows ####
+@traced('loader')
+def get_expenditure_panel(page = None):
+    return in_scope(get_source('expenditure', page, panel = True)).sort_values(['Country', 'Year'], ignore_index = True)
 
-    return income
+@traced('loader')
+def get_disposable_income_panel(page = None):
+    return get_source('disposable_income', page, panel = True)
 
-#### DATA: Obesity_Rate ####
-def get_obesity_rate_by_country():
-    page = requests.get('https://en.wikipedia.org/wiki/List_of_countries_by_obesity_rate').text
-    soup = BeautifulSoup(page, 'html.parser')
-    table = soup.find('table', class_="wikitable plainrowheaders sortable sticky-header sort-under")
-
-    obesity = pd.read_html(str(table))
-    obesity = pd.concat(obesity)
-
-    obesity = obesity[['Country', 'Percentage of adults with obesity (BMI≥30)']]
-    obesity = obesity.rename(columns = {'Percentage of adults with obesity (BMI≥30)':'Obesity_Rate'})
-    obesity['Obesity_Rate'] = pd.to_numeric(obesity['Obesity_Rate'], errors='coerce')
-    obesity = obesity.dropna()
-    obesity['Obesity_Rate'] = obesity['Obesity_Rate']
-    return obesity
-
-#### CHART: Life expenctancy vs health expenditure ####
-def chart_life_expectancy_vs_health_expenditure(healthcare):
-    fig, ax = plt.subplots()
-    fig.set_figheight(16 * 0.75)
-    fig.set_figwidth(9 * 0.75)
-    plt.xlabel('Health Expenditure per capita', fontsize = 16)
-    plt.ylabel('Life Expenctancy', fontsize = 16)
-    plt.suptitle('Life expenctancy vs health expenditure', fontsize = 20)
-    plt.title(' ')
-    plt.tight_layout()
-    plt.grid(linestyle=':')
-    ax.spines['top'].set_visible(False)
-    ax.spines['right'].set_visible(False)
-    ax.set_xlim([1000, 13000])
-    ax.set_ylim([75, 85])
-    ax.xaxis.set_major_formatter('${x:,.0f}')
-    ax.scatter(healthcare['Expenditure'], healthcare['Life_Expectancy'], color = "#327ebd")
-    ax.scatter(healthcare['Expenditure'].values[healthcare['Country'] == 'United States'], healthcare['Life_Expectancy'].values[healthcare['Country'] == 'United States'], color = '#bd3232')
-
-    annotate_offsets = [
-        (-750, -0.15), # Australia
-        (100, -0.05), # Austria
-        (100, 0.15), # Belgium
-        (100, 0.00), # Canada
-        (100, 0.00), # Chile
-        (100, 0.00), # Costa Rica
-        (-300, -0.15), # Denmark
-        (-300, -0.15), # Estonia
-        (-1100, -0.07), # Finland
-        (0, 0.05), # France
-        (-800, -0.15), # Germany
-        (-800, -0.15), # Greece
-        (-800, -0.15), # Hungary
-        (-1100, -0.03), # Ireland
-        (-800, 0.0), # Italy
-        (-1000, -0.1), # Japan
-        (-1000, -0.15), # Latvia
-        (-1000, -0.15), # Lithuania
-        (-1000, -0.1), # Luxembourg
-        (100, 0.1), # Mexico
-        (100, -0.05), # Netherlands
-        (-2100, -0.03), # New Zealand
-        (-200, -0.15), # Norway
-        (-1100, -0.03), # Poland
-        (-1400, -0.03), # Portugal
-        (-1000, -0.15), # Slovakia
-        (-1000, -0.15), # Slovenia
-        (-1000, -0.15), # South Korea
-        (50, -0.15), # Spain
-        (-1000, -0.15), # Sweden
-        (-500, -0.15), # Switzerland
-        (-1200, -0.15), # United Kingdom
-        (-2200, -0.02)  # United States
-        ]
-
-    for i, label in enumerate(healthcare['Country']):
-        ax.annotate(label, (healthcare['Expenditure'].values[i] + annotate_offsets[i][0], healthcare['Life_Expectancy'].values[i] + annotate_offsets[i][1]), alpha = 0.55)
-
-#### CHART: Health expenditure by disposable income ####
-def chart_expenditure_by_income(healthcare):
-    fig, ax = plt.subplots()
-    fig.set_figheight(16 * 0.75)
-    fig.set_figwidth(9 * 0.75)
-    plt.xlabel('Health expenditure percent of disposable income', fontsize = 16)
-    plt.ylabel('Disposable income', fontsize = 16)
-    plt.suptitle('Health expenditure by disposable income', fontsize = 20)
-    plt.title(' ')
-    plt.tight_layout()
-    plt.grid(linestyle=':')
-    ax.spines['top'].set_visible(False)
-    ax.spines['right'].set_visible(False)
-    # ax.set_xlim([1000, 13000])
-    # ax.set_ylim([78, 84])
-    ax.xaxis.set_major_formatter('{x:,.0f}%')
-    ax.yaxis.set_major_formatter('${x:,.0f}')
-    ax.scatter(healthcare['Expenditure_As_Percent_of_Income'], healthcare['Disposable_Income'], color = "#327ebd")
-    ax.scatter(healthcare['Expenditure_As_Percent_of_Income'].values[healthcare['Country'] == 'United States'], healthcare['Disposable_Income'].values[healthcare['Country'] == 'United States'], color = '#bd3232')
-
-    annotate_offsets = [
-        (0.1, -200), # Australia
-        (-1.0, -1000), # Austria
-        (-1.7, -200), # Belgium
-        (0.2, -300), # Canada
-        (-0.5, -1000), # Chile
-        (-1.0, -1000), # Costa Rica
-        (-1.0, -1000), # Denmark
-        (0.2, -200), # Estonia
-        (-1.0, -1000), # Finland
-        (-1.0, -1000), # France
-        (-0.5, -1000), # Germany
-        (-1.0, -1000), # Greece
-        (0.2, -200), # Hungary
-        (-1.0, -1000), # Ireland
-        (-1.0, -1000), # Italy
-        (-0.5, -1000), # Japan
-        (0.2, -200), # Latvia
-        (-1.0, -1000), # Lithuania
-        (-1.0, -1000), # Luxembourg
-        (0.0, -1000), # Mexico
-        (-1.0, -1000), # Netherlands
-        (-1.0, -1000), # New Zealand
-        (-0.5, -1000), # Norway
-        (-1.0, -1000), # Poland
-        (-1.6, -1000), # Portugal
-        (-1.0, -1000), # Slovakia
-        (0.2, -200), # Slovenia
-        (-1.0, -1000), # South Korea
-        (0.0, -1000), # Spain
-        (0.1, 0), # Sweden
-        (0.2, -100), # Switzerland
-        (-0.5, -1000), # United Kingdom
-        (-2.5, -1000)  # United States
-        ]
-
-    for i, label in enumerate(healthcare['Country']):
-        ax.annotate(label, (healthcare['Expenditure_As_Percent_of_Income'].values[i] + annotate_offsets[i][0], healthcare['Disposable_Income'].values[i] + annotate_offsets[i][1]), alpha = 0.55)
-
-#### CHART: Health expenditure percent by disposable income ####
-def chart_expenditure_by_income_trend(healthcare):
-    fig, ax = plt.subplots()
-    fig.set_figheight(16 * 0.75)
-    fig.set_figwidth(9 * 0.75)
-    plt.xlabel('Health expenditure percent of disposable income', fontsize = 16)
-    plt.ylabel('Disposable income', fontsize = 16)
-    plt.suptitle('Health expenditure percent by disposable income', fontsize = 20)
-    plt.title(' ')
-    plt.tight_layout()
-    plt.grid(linestyle=':')
-    ax.spines['top'].set_visible(False)
-    ax.spines['right'].set_visible(False)
-    # ax.set_xlim([1000, 13000])
-    # ax.set_ylim([78, 84])
-    ax.xaxis.set_major_formatter('{x:,.0f}%')
-    ax.yaxis.set_major_formatter('${x:,.0f}')
-    ax.scatter(healthcare['Expenditure_As_Percent_of_Income'], healthcare['Disposable_Income'], color = "#327ebd")
-    ax.scatter(healthcare['Expenditure_As_Percent_of_Income'].values[healthcare['Country'] == 'United States'], healthcare['Disposable_Income'].values[healthcare['Country'] == 'United States'], color = '#bd3232')
-    ax.plot(healthcare['Expenditure_As_Percent_of_Income_Trend'], healthcare['Disposable_Income'], color = '#646464')
-    annotate_offsets = [
-        (0.1, -200), # Australia
-        (-1.0, -1000), # Austria
-        (-1.7, -200), # Belgium
-        (0.2, -300), # Canada
-        (-0.5, -1000), # Chile
-        (-1.0, -1000), # Costa Rica
-        (-1.0, -1000), # Denmark
-        (0.2, -200), # Estonia
-        (-1.0, -1000), # Finland
-        (-1.0, -1000), # France
-        (-0.5, -1000), # Germany
-        (-1.0, -1000), # Greece
-        (0.2, -200), # Hungary
-        (-1.0, -1000), # Ireland
-        (-1.0, -1000), # Italy
-        (-0.5, -1000), # Japan
-        (0.2, -200), # Latvia
-        (-1.0, -1000), # Lithuania
-        (-1.0, -1000), # Luxembourg
-        (0.0, -1000), # Mexico
-        (-1.0, -1000), # Netherlands
-        (-1.0, -1000), # New Zealand
-        (-0.5, -1000), # Norway
-        (-1.0, -1000), # Poland
-        (-1.6, -1000), # Portugal
-        (-1.0, -1000), # Slovakia
-        (0.2, -200), # Slovenia
-        (-1.0, -1000), # South Korea
-        (0.0, -1000), # Spain
-        (0.1, 0), # Sweden
-        (0.2, -100), # Switzerland
-        (-0.5, -1000), # United Kingdom
-        (-2.5, -1000)  # United States
-        ]
-
-    for i, label in enumerate(healthcare['Country']):
-        ax.annotate(label, (healthcare['Expenditure_As_Percent_of_Income'].values[i] + annotate_offsets[i][0], healthcare['Disposable_Income'].values[i] + annotate_offsets[i][1]), alpha = 0.55)
-
-#### CHART: Excess expenditure (percent) of disposable income ####
-def chart_excess_expenditure(healthcare):
-    healthcare = healthcare.sort_values('Excess_Expenditure_as_Percent')
-    fig, ax = plt.subplots()
-    fig.set_figheight(16 * 0.75)
-    fig.set_figwidth(9 * 0.75)
-    plt.xlabel('Excess expenditure', fontsize = 16)
-    plt.ylabel('Country', fontsize = 16)
-    plt.suptitle('Excess expenditure (percent) of disposable income', fontsize = 20)
-    plt.title(' ')
-    plt.tight_layout()
-    ax.spines['top'].set_visible(False)
-    ax.spines['right'].set_visible(False)
-    ax.xaxis.set_major_formatter('{x:,.0f}%')
-    ax.barh(healthcare['Country'], healthcare['Excess_Expenditure_as_Percent'], color = "#327ebd")
-    ax.barh(healthcare['Country'].values[healthcare['Country'] == 'United States'], healthcare['Excess_Expenditure_as_Percent'].values[healthcare['Country'] == 'United States'], color = '#bd3232')
-
-#### CHART: Life expenctancy vs obesity rate ####
-def chart_life_expectancy_vs_obesity_rate(healthcare):
-    fig, ax = plt.subplots()
-    fig.set_figheight(16 * 0.75)
-    fig.set_figwidth(9 * 0.75)
-    plt.xlabel('Obesity rate', fontsize = 16)
-    plt.ylabel('Life expenctancy', fontsize = 16)
-    plt.suptitle('Life expenctancy vs obesity rate', fontsize = 20)
-    plt.title(' ')
-    plt.tight_layout()
-    plt.grid(linestyle=':')
-    ax.spines['top'].set_visible(False)
-    ax.spines['right'].set_visible(False)
-    # ax.set_xlim([1000, 13000])
-    # ax.set_ylim([78, 84])
-    ax.xaxis.set_major_formatter('{x:,.0f}%')
-    ax.scatter(healthcare['Obesity_Rate'], healthcare['Life_Expectancy'], color = "#327ebd")
-    ax.scatter(healthcare['Obesity_Rate'].values[healthcare['Country'] == 'United States'], healthcare['Life_Expectancy'].values[healthcare['Country'] == 'United States'], color = '#bd3232')
-
-    annotate_offsets = [
-        (-1.8, -0.16), # Australia
-        (-1.8, -0.16), # Austria
-        (-1.8, -0.16), # Belgium
-        (-1.8, -0.16), # Canada
-        (-1.8, -0.16), # Chile
-        (-1.8, -0.16), # Costa Rica
-        (-4.8, -0.1), # Denmark
-        (-1.8, -0.16), # Estonia
-        (-1.8, -0.16), # Finland
-        (-1.8, -0.16), # France
-        (-1.8, -0.16), # Germany
-        (-1.8, -0.16), # Greece
-        (-1.8, -0.16), # Hungary
-        (0.4, -0.05), # Ireland
-        (0.4, -0.05), # Italy
-        (0.4, -0.05), # Japan
-        (0.4, -0.05), # Latvia
-        (-1.8, -0.16), # Lithuania
-        (-1.8, 0.16), # Luxembourg
-        (-2.8, -0.16), # Mexico
-        (-6.3, 0.0), # Netherlands
-        (0.4, -0.05), # New Zealand
-        (0.4, -0.05), # Norway
-        (-1.8, -0.16), # Poland
-        (-1.8, -0.16), # Portugal
-        (-1.8, -0.16), # Slovakia
-        (-1.8, -0.16), # Slovenia
-        (-1.8, -0.16), # South Korea
-        (-1.8, -0.16), # Spain
-        (-1.8, -0.16), # Sweden
-        (-1.8, -0.16), # Switzerland
-        (-1.5, -0.16), # United Kingdom
-        (-2.8, 0.16)  # United States
-        ]
-
-    for i, label in enumerate(healthcare['Country']):
-        ax.annotate(label, (healthcare['Obesity_Rate'].values[i] + annotate_offsets[i][0], healthcare['Life_Expectancy'].values[i] + annotate_offsets[i][1]), alpha = 0.55)
-
-#### CHART: Life expenctancy vs obesity rate ####
-def chart_life_expectancy_vs_obesity_rate_trend(healthcare):
-    fig, ax = plt.subplots()
-    fig.set_figheight(16 * 0.75)
-    fig.set_figwidth(9 * 0.75)
-    plt.xlabel('Obesity rate', fontsize = 16)
-    plt.ylabel('Life expenctancy', fontsize = 16)
-    plt.suptitle('Life expenctancy vs obesity rate', fontsize = 20)
-    plt.title(' ')
-    plt.tight_layout()
-    plt.grid(linestyle=':')
-    ax.spines['top'].set_visible(False)
-    ax.spines['right'].set_visible(False)
-    # ax.set_xlim([1000, 13000])
-    # ax.set_ylim([78, 84])
-    ax.xaxis.set_major_formatter('{x:,.0f}%')
-    ax.scatter(healthcare['Obesity_Rate'], healthcare['Life_Expectancy'], color = "#327ebd")
-    ax.scatter(healthcare['Obesity_Rate'].values[healthcare['Country'] == 'United States'], healthcare['Life_Expectancy'].values[healthcare['Country'] == 'United States'], color = '#bd3232')
-    ax.plot(healthcare['Obesity_Rate'], healthcare['Life_Expectancy_Trend'], color = '#646464')
-
-    annotate_offsets = [
-        (-1.8, -0.16), # Australia
-        (-1.8, -0.16), # Austria
-        (-1.8, -0.16), # Belgium
-        (-1.8, -0.16), # Canada
-        (-1.8, -0.16), # Chile
-        (-1.8, -0.16), # Costa Rica
-        (-4.8, -0.1), # Denmark
-        (-1.8, -0.16), # Estonia
-        (-1.8, -0.16), # Finland
-        (-1.8, -0.16), # France
-        (-1.8, -0.16), # Germany
-        (-1.8, -0.16), # Greece
-        (-1.8, -0.16), # Hungary
-        (0.4, -0.05), # Ireland
-        (0.4, -0.05), # Italy
-        (0.4, -0.05), # Japan
-        (0.4, -0.05), # Latvia
-        (-1.8, -0.16), # Lithuania
-        (-1.8, 0.16), # Luxembourg
-        (-2.8, -0.16), # Mexico
-        (-6.3, 0.0), # Netherlands
-        (0.4, -0.05), # New Zealand
-        (0.4, -0.05), # Norway
-        (-1.8, -0.16), # Poland
-        (-1.8, -0.16), # Portugal
-        (-1.8, -0.16), # Slovakia
-        (-1.8, -0.16), # Slovenia
-        (-1.8, -0.16), # South Korea
-        (-1.8, -0.16), # Spain
-        (-1.8, -0.16), # Sweden
-        (-1.8, -0.16), # Switzerland
-        (-1.5, -0.16), # United Kingdom
-        (-2.8, 0.16)  # United States
-        ]
-
-    for i, label in enumerate(healthcare['Country']):
-        ax.annotate(label, (healthcare['Obesity_Rate'].values[i] + annotate_offsets[i][0], healthcare['Life_Expectancy'].values[i] + annotate_offsets[i][1]), alpha = 0.55)
-
-#### CHART: Years added ####
-def chart_years_added(healthcare):
-    healthcare = healthcare.sort_values('Years_Added')
-    fig, ax = plt.subplots()
-    fig.set_figheight(16 * 0.75)
-    fig.set_figwidth(9 * 0.75)
-    plt.xlabel('Years Added', fontsize = 16)
-    plt.ylabel('Country', fontsize = 16)
-    plt.suptitle('Years added (adjusted for obesity rate)', fontsize = 20)
-    plt.title(' ')
-    plt.tight_layout()
-    ax.spines['top'].set_visible(False)
-    ax.spines['right'].set_visible(False)
-    ax.xaxis.set_major_formatter('{x:,.1f}%')
-    ax.barh(healthcare['Country'], healthcare['Years_Added'], color = "#327ebd")
-    ax.barh(healthcare['Country'].values[healthcare['Country'] == 'United States'], healthcare['Years_Added'].values[healthcare['Country'] == 'United States'], color = '#bd3232')
-
-#### CHART: Excess disposable income by years added ####
-def chart_excess_disposable_income_by_years_added(healthcare):
-    ##### Excess Disposable Income vs Years Added ####
-    fig, ax = plt.subplots()
-    fig.set_figheight(16 * 0.75)
-    fig.set_figwidth(9 * 0.75)
-    plt.xlabel('Years added', fontsize = 16)
-    plt.ylabel('Excess disposable income', fontsize = 16)
-    plt.suptitle('Excess disposable income by years added', fontsize = 20)
-    plt.title(' ')
-    plt.tight_layout()
-    plt.grid(linestyle=':')
-    ax.spines['top'].set_visible(False)
-    ax.spines['right'].set_visible(False)
-    # ax.set_xlim([15000, 55000])
-    ax.set_ylim([15000, 55000])
-    ax.xaxis.set_major_formatter('{x:,.0f}%')
-    ax.yaxis.set_major_formatter('${x:,.0f}')
-    ax.scatter(healthcare['Years_Added'], healthcare['Excess_Disposable_Income'], color = "#327ebd")
-    ax.scatter(healthcare['Years_Added'].values[healthcare['Country'] == 'United States'], healthcare['Excess_Disposable_Income'].values[healthcare['Country'] == 'United States'], color = '#bd3232')
-    ax.vlines(0, 15000, 55000, color = '#646464', alpha = 0.35)
-              
-    annotate_offsets = [
-        (-0.5, -800), # Australia
-        (-0.5, -800), # Austria
-        (0.1, -200), # Belgium
-        (0.1, -200), # Canada
-        (-0.5, -800), # Chile
-        (-0.5, -800), # Costa Rica
-        (-0.5, -800), # Denmark
-        (-0.5, -800), # Estonia
-        (0.1, -200), # Finland
-        (-0.5, -800), # France
-        (-0.5, -800), # Germany
-        (-0.5, -800), # Greece
-        (-0.9, -800), # Hungary
-        (-0.5, -800), # Ireland
-        (0.1, -200), # Italy
-        (0.1, -200), # Japan
-        (0.1, -200), # Latvia
-        (0.1, -200), # Lithuania
-        (-0.5, -800), # Luxembourg
-        (0.1, -200), # Mexico
-        (-0.5, -1200), # Netherlands
-        (0.1, -200), # New Zealand
-        (-0.5, -800), # Norway
-        (-0.5, -800), # Poland
-        (0.1, -200), # Portugal
-        (0.1, -200), # Slovakia
-        (0.1, -200), # Slovenia
-        (-0.5, -800), # South Korea
-        (-0.5, -800), # Spain
-        (-0.5, -800), # Sweden
-        (0.1, -200), # Switzerland
-        (-0.5, -800), # United Kingdom
-        (-0.5, -800)  # United States
-        ]
-
-    for i, label in enumerate(healthcare['Country']):
-        ax.annotate(label, (healthcare['Years_Added'].values[i] + annotate_offsets[i][0], healthcare['Excess_Disposable_Income'].values[i] + annotate_offsets[i][1]), alpha = 0.55)
+#### Registered sources beyond the built-in four ####
+def extra_sources():
+    return [name for name in REGISTRY if name not in CORE_SOURCES]
 
 ##############################
-####### Recreate chart #######
+####### Pipeline stages ######
 ##############################
 
-#### Data Imports ####
-expenditure_by_country = get_expenditure_by_country()
-life_expectancy_by_country = get_life_expectancy_by_country()
-
 #### Combine Datasets ####
-healthcare = expenditure_by_country.merge(life_expectancy_by_country, how = 'left', on = 'Country')
-
-#### Chart life expectancy vs health expenditure
-chart_life_expectancy_vs_health_expenditure(healthcare)
+@traced()
+def combine_datasets(expenditure_by_country, life_expectancy_by_country):
+    return join_countries(expenditure_by_country, life_expectancy_by_country)
 
 ###############################
 #### Add disposable income ####
 ###############################
 
-disposable_income_by_country = get_disposable_income_by_country()
-healthcare = healthcare.merge(disposable_income_by_country, how = 'left', on = 'Country')
-healthcare['Expenditure_As_Percent_of_Income'] = (healthcare['Expenditure']/healthcare['Disposable_Income'])*100
-
-#### Chart Expenditure by Income ####
-chart_expenditure_by_income(healthcare)
+@traced()
+def add_disposable_income(healthcare, disposable_income_by_country):
+    healthcare = join_countries(healthcare, disposable_income_by_country)
+    healthcare['Expenditure_As_Percent_of_Income'] = (healthcare['Expenditure']/healthcare['Disposable_Income'])*100
+    return healthcare
 
 #### Draw Trendline ####
-reg_expenditure_by_income = LinearRegression()
-reg_expenditure_by_income.fit(healthcare[['Disposable_Income']], healthcare['Expenditure_As_Percent_of_Income'])
-healthcare['Expenditure_As_Percent_of_Income_Trend'] = reg_expenditure_by_income.predict(healthcare[['Disposable_Income']])
-
-#### Chart with Trendline ####
-chart_expenditure_by_income_trend(healthcare)
+@traced()
+def add_expenditure_trend(healthcare, resamples = 0, seed = 0):
+    healthcare = healthcare.copy()
+    reg_expenditure_by_income = fit_lines(healthcare['Disposable_Income'], healthcare['Expenditure_As_Percent_of_Income'])
+    healthcare['Expenditure_As_Percent_of_Income_Trend'] = reg_expenditure_by_income.trend
 
-#### Calculate Difference from Trendline ####
-healthcare['Excess_Expenditure_as_Percent'] = healthcare['Expenditure_As_Percent_of_Income'] - healthcare['Expenditure_As_Percent_of_Income_Trend']
+    #### Calculate Difference from Trendline ####
+    healthcare['Excess_Expenditure_as_Percent'] = reg_expenditure_by_income.residuals
 
-#### Calculate Difference from Trendline ####
-chart_excess_expenditure(healthcare)
+    #### Resampling mode: bootstrap and leave-one-out intervals ####
+    if resamples:
+        healthcare = add_trend_intervals(healthcare, 'Disposable_Income', 'Expenditure_As_Percent_of_Income', 'Excess_Expenditure_as_Percent', resamples, seed)
+    return healthcare
 
 ###################################
 ######## Add Obesity Rates ########
 ###################################
 
-obesity_rate_by_country = get_obesity_rate_by_country()
-healthcare = healthcare.merge(obesity_rate_by_country, how = 'left', on = 'Country')
-
-#### Chart Life Expectancy vs Obesity Rate ####
-chart_life_expectancy_vs_obesity_rate(healthcare)
+@traced()
+def add_obesity_rate(healthcare, obesity_rate_by_country):
+    return join_countries(healthcare, obesity_rate_by_country)
 
 #### Draw Trendline ####
-reg_life_expectancy_vs_obesity_rate = LinearRegression()
-reg_life_expectancy_vs_obesity_rate.fit(healthcare[['Obesity_Rate']], healthcare['Life_Expectancy'])
-healthcare['Life_Expectancy_Trend'] = reg_life_expectancy_vs_obesity_rate.predict(healthcare[['Obesity_Rate']])
-
-#### Chart Trendline ####
-chart_life_expectancy_vs_obesity_rate_trend(healthcare)
-
-#### Calculate Years Added ####
-healthcare['Years_Added'] = healthcare['Life_Expectancy'] - healthcare['Life_Expectancy_Trend']
-chart_years_added(healthcare)
+@traced()
+def add_life_expectancy_trend(healthcare, resamples = 0, seed = 0):
+    healthcare = healthcare.copy()
+    reg_life_expectancy_vs_obesity_rate = fit_lines(healthcare['Obesity_Rate'], healthcare['Life_Expectancy'])
+    healthcare['Life_Expectancy_Trend'] = reg_life_expectancy_vs_obesity_rate.trend
+
+    #### Calculate Years Added ####
+    healthcare['Years_Added'] = reg_life_expectancy_vs_obesity_rate.residuals
+
+    #### Resampling mode: bootstrap and leave-one-out intervals ####
+    if resamples:
+        healthcare = add_trend_intervals(healthcare, 'Obesity_Rate', 'Life_Expectancy', 'Years_Added', resamples, seed)
+    return healthcare
+
+#### Per-country interval columns; slope/intercept intervals go in attrs['trend_intervals'] as records ####
+@traced()
+def add_trend_intervals(healthcare, x, y, name, resamples, seed):
+    intervals = trend_intervals(healthcare, x, y, name, resamples = resamples, seed = seed)
+    healthcare = pd.concat([healthcare, intervals.countries], axis = 1)
+    healthcare.attrs['trend_intervals'] = intervals.coefficients.to_dict('records')
+    return healthcare
 
 #########################
 ######## Results ########
 #########################
 
-#### Chart Years Added by Excess Disposable Income ####
-healthcare['Excess_Disposable_Income'] = healthcare['Disposable_Income'] - healthcare['Expenditure']
-chart_excess_disposable_income_by_years_added(healthcare)
+@traced()
+def combine_results(expenditure_trend, life_expectancy_trend):
+    added = ['Code'] + [column for column in life_expectancy_trend.columns if column not in expenditure_trend.columns]
+    healthcare = join_countries(expenditure_trend, life_expectancy_trend[added])
+    healthcare['Excess_Disposable_Income'] = healthcare['Disposable_Income'] - healthcare['Expenditure']
+
+    intervals = [record for frame in (expenditure_trend, life_expectancy_trend) for record in frame.attrs.get('trend_intervals', [])]
+    healthcare.attrs = {'trend_intervals': intervals} if intervals else {}
+    return healthcare
+
+#### healthcare.<ext> (and trend_intervals.<ext>) plus manifest.json; see export.py ####
+@traced('export')
+def export_results(healthcare, formats = EXPORT_FORMATS):
+    tables = {'healthcare': healthcare}
+    if 'trend_intervals' in healthcare.attrs:
+        tables['trend_intervals'] = pd.DataFrame(healthcare.attrs['trend_intervals'])
+    return export_tables(tables, output_dir, formats)
+
+#######################
+##### Indicators ######
+#######################
+
+#### The results with every extra registered indicator joined on ####
+@traced()
+def add_indicators(healthcare, *indicators):
+    for indicator in indicators:
+        healthcare = join_countries(healthcare, indicator)
+    return healthcare
+
+@traced('export')
+def export_indicators(indicators, formats = EXPORT_FORMATS):
+    return export_tables({'indicators': indicators}, output_dir, formats)
+
+#######################
+######## Model ########
+#######################
+
+#### Covariates of the adjusted life expectancy model; any other numeric column of the results can be added ####
+MODEL_COVARIATES = ('Expenditure', 'Disposable_Income', 'Obesity_Rate')
+
+# Years_Added adjusts life expectancy for obesity alone. This fits it on every
+# covariate at once (ridge when alpha > 0): Adjusted_Years_Added is each country's
+# life expectancy beyond the model's, next to the coefficient table and every
+# subset of the covariates scored by cross-validation. A few dozen rows solve in
+# microseconds, so the folds stay in this process.
+@traced()
+def fit_life_expectancy_model(healthcare, covariates = MODEL_COVARIATES, alpha = 0.0, folds = 5, seed = 0):
+    model = fit_model(healthcare, 'Life_Expectancy', covariates, alpha)
+    adjusted = healthcare[['Country', 'Code', 'Life_Expectancy']].assign(Life_Expectancy_Model = model.fitted, Adjusted_Years_Added = model.residuals)
+    return {
+        'life_expectancy_model': adjusted,
+        'model_coefficients': coefficient_table(model, healthcare),
+        'covariate_sets': evaluate_covariate_sets(healthcare, 'Life_Expectancy', covariates, alpha = alpha, folds = folds, seed = seed, workers = 1),
+    }
+
+@traced('export')
+def export_model(tables, formats = EXPORT_FORMATS):
+    return export_tables(tables, output_dir, formats)
+
+#######################
+######## Sweep ########
+#######################
+
+# The trends refitted over tens of thousands of country subsets -- leave-k-out,
+# random subsamples, regions alone and left out -- to show how much each country's
+# Years_Added and Excess_Expenditure_as_Percent, and its rank on them, depend on
+# which countries are in the fit. See sweeps.sensitivity_sweep.
+@traced()
+def sweep_results(healthcare, leave_out = DEFAULT_LEAVE_OUT, samples = DEFAULT_SAMPLES, fraction = DEFAULT_FRACTION, seed = 0, workers = None):
+    return sensitivity_sweep(healthcare, leave_out = leave_out, samples = samples, fraction = fraction, seed = seed, workers = workers)
+
+@traced('export')
+def export_sweep(tables, formats = EXPORT_FORMATS):
+    return export_tables(tables, output_dir, formats)
+
+#######################
+######## Panel ########
+#######################
+
+#### Life expectancy and obesity tables have no year columns; they apply to every year ####
+@traced()
+def combine_panel(expenditure_panel, life_expectancy_by_country, disposable_income_panel, obesity_rate_by_country):
+    panel = build_panel([expenditure_panel, disposable_income_panel], [life_expectancy_by_country, obesity_rate_by_country])
+    panel = in_scope(panel).reset_index(drop = True)
+    return panel_metrics(panel)
+
+@traced('export')
+def export_panel_results(panel, formats = EXPORT_FORMATS):
+    return export_panel(panel, os.path.join(output_dir, 'panel'), formats)
+
+#### Charts and the stage whose frame each one draws ####
+CHARTS = {
+    'chart_life_expectancy_vs_health_expenditure': 'healthcare',
+    'chart_expenditure_by_income': 'with_income',
+    'chart_expenditure_by_income_trend': 'expenditure_trend',
+    'chart_excess_expenditure': 'expenditure_trend',
+    'chart_life_expectancy_vs_obesity_rate': 'with_obesity',
+    'chart_life_expectancy_vs_obesity_rate_trend': 'life_expectancy_trend',
+    'chart_years_added': 'life_expectancy_trend',
+    'chart_excess_disposable_income_by_years_added': 'results',
+}
+
+#### The frames the charts draw from, in stage input order ####
+CHART_INPUTS = sorted(set(CHARTS.values()))
+
+#### Every chart, rendered headless to <output dir>/charts/ ####
+def render_results(*frames, formats = FORMATS, workers = None):
+    frames = dict(zip(CHART_INPUTS, frames))
+    jobs = [(chart, frames[source], None) for chart, source in CHARTS.items()]
+    return render_charts(jobs, os.path.join(output_dir, 'charts'), formats, workers)
+
+#### Every chart for every panel year, to <output dir>/charts/<year>/ ####
+def render_panel(panel, formats = FORMATS, workers = None):
+    jobs = [(chart, table.reset_index(drop = True), year) for year, table in panel.groupby('Year') for chart in CHARTS]
+    return render_charts(jobs, os.path.join(output_dir, 'charts'), formats, workers)
+
+# The steps above as named stages; see pipeline.py. The income and obesity branches
+# only share the combined base frame, so they run in parallel, and a re-run only
+# recomputes what a changed source or edited formula feeds into.
+#
+# panel adds the country x year stages: every year of the sources, with the trends
+# fitted per year, written to <output dir>/panel/.
+#
+# model adds the multivariate life expectancy model (see fit_life_expectancy_model)
+# with extra covariates, a ridge alpha and the number of cross-validation folds.
+#
+# sweep adds the sensitivity sweep (see sweep_results) with the leave-out sizes,
+# the number and fraction of random subsamples, and seed and workers shared with
+# the rest of the run.
+#
+# Sources registered beyond the built-in four (sources.REGISTRY, --sources) each
+# get a loader stage and are joined onto the results as 'indicators', which the
+# model then draws its covariates from.
+def build_pipeline(charts = True, resamples = 0, seed = 0, panel = False, formats = FORMATS, workers = None, export_formats = EXPORT_FORMATS,
+                   model = False, covariates = (), alpha = 0.0, folds = 5, sweep = False, leave_out = DEFAULT_LEAVE_OUT, samples = DEFAULT_SAMPLES,
+                   fraction = DEFAULT_FRACTION):
+    pipeline = Pipeline(directory = page_cache.root)
+
+    pipeline.add('expenditure', get_expenditure_by_country, volatile = True)
+    pipeline.add('life_expectancy', get_life_expectancy_by_country, volatile = True)
+    pipeline.add('disposable_income', get_disposable_income_by_country, volatile = True)
+    pipeline.add('obesity_rate', get_obesity_rate_by_country, volatile = True)
+
+    pipeline.add('healthcare', combine_datasets, inputs = ['expenditure', 'life_expectancy'])
+    pipeline.add('with_income', add_disposable_income, inputs = ['healthcare', 'disposable_income'])
+    pipeline.add('expenditure_trend', add_expenditure_trend, inputs = ['with_income'], params = {'resamples': resamples, 'seed': seed})
+    pipeline.add('with_obesity', add_obesity_rate, inputs = ['healthcare', 'obesity_rate'])
+    pipeline.add('life_expectancy_trend', add_life_expectancy_trend, inputs = ['with_obesity'], params = {'resamples': resamples, 'seed': seed})
+    pipeline.add('results', combine_results, inputs = ['expenditure_trend', 'life_expectancy_trend'])
+    pipeline.add('export', export_results, inputs = ['results'], persist = False, params = {'formats': tuple(export_formats)})
+
+    #### Sources declared beyond the built-in four load as their own stages, joined onto the results ####
+    extras = extra_sources()
+    for name in extras:
+        if name in pipeline.stages:
+            raise PipelineError(f'source {name!r} clashes with a pipeline stage name')
+        pipeline.add(name, traced('loader', name)(get_source), volatile = True, params = {'name': name})
+    if extras:
+        pipeline.add('indicators', add_indicators, inputs = ['results'] + extras)
+        pipeline.add('export_indicators', export_indicators, inputs = ['indicators'], persist = False, params = {'formats': tuple(export_formats)})
+
+    if model:
+        params = {'covariates': tuple(dict.fromkeys(MODEL_COVARIATES + tuple(covariates))), 'alpha': alpha, 'folds': folds, 'seed': seed}
+        pipeline.add('model', fit_life_expectancy_model, inputs = ['indicators' if extras else 'results'], params = params)
+        pipeline.add('export_model', export_model, inputs = ['model'], persist = False, params = {'formats': tuple(export_formats)})
+
+    if sweep:
+        params = {'leave_out': tuple(leave_out), 'samples': samples, 'fraction': fraction, 'seed': seed, 'workers': workers}
+        pipeline.add('sweep', sweep_results, inputs = ['results'], params = params)
+        pipeline.add('export_sweep', export_sweep, inputs = ['sweep'], persist = False, params = {'formats': tuple(export_formats)})
+
+    if panel:
+        pipeline.add('expenditure_panel', get_expenditure_panel, volatile = True)
+        pipeline.add('disposable_income_panel', get_disposable_income_panel, volatile = True)
+        pipeline.add('panel', combine_panel, inputs = ['expenditure_panel', 'life_expectancy', 'disposable_income_panel', 'obesity_rate'])
+        pipeline.add('export_panel', export_panel_results, inputs = ['panel'], persist = False, params = {'formats': tuple(export_formats)})
+
+    #### Charts render in worker processes; the stage only waits for them ####
+    if charts:
+        pipeline.add('charts', render_results, inputs = CHART_INPUTS, persist = False, params = {'formats': tuple(formats), 'workers': workers})
+        if panel:
+            pipeline.add('panel_charts', render_panel, inputs = ['panel'], persist = False, params = {'formats': tuple(formats), 'workers': workers})
+
+    return pipeline
+
+#### Source rows whose country name matched nothing in countries.csv, or only without its parenthesized qualifier ####
+def unmatched_countries(pipeline, outputs):
+    lines = []
+    for name, stage in pipeline.stages.items():
+        attrs = getattr(outputs.get(name), 'attrs', {})
+        if stage.volatile and attrs.get('unmatched'):
+            lines.append(f"{name}: no country code for {', '.join(attrs['unmatched'])}")
+        if stage.volatile and attrs.get('approximate'):
+            lines.append(f"{name}: matched ignoring parentheses: {', '.join(attrs['approximate'])}")
+    return lines
+
+##############################
+####### Recreate chart #######
+##############################
 
-healthcare.to_csv('healthcare.csv')
+def main(argv = None):
+    parser = argparse.ArgumentParser(prog = 'python -m healthcare', description = 'Healthcare expenditure vs life expectancy analysis')
+    parser.add_argument('--output-dir', default = '.', help = 'where results, charts and manifest.json are written (default: current directory)')
+    parser.add_argument('--export-formats', default = ','.join(EXPORT_FORMATS), help = 'comma-separated result table formats: csv, parquet, jsonl (default: %(default)s)')
+    parser.add_argument('--cache-dir', help = 'page/table/stage cache (default: $HEALTHCARE_CACHE_DIR or ~/.cache/healthcare)')
+    parser.add_argument('--offline', action = 'store_true', help = 'only use cached pages, never the network')
+    parser.add_argument('--base-url', help = 'fetch source pages from this host instead of Wikipedia, e.g. a local stand-in')
+    parser.add_argument('--bootstrap', type = int, default = 0, metavar = 'N', help = 'add bootstrap (N resamples) and leave-one-out intervals to the trends and residuals')
+    parser.add_argument('--seed', type = int, default = 0, help = 'random seed for --bootstrap, --model folds and --sweep')
+    parser.add_argument('--all-countries', action = 'store_true', help = 'cover every country the sources list instead of the curated 33')
+    parser.add_argument('--panel', action = 'store_true', help = 'also compute every year in the sources and write per-year tables to <output dir>/panel/')
+    parser.add_argument('--sources', metavar = 'FILE', help = 'JSON list of extra indicator sources (web tables or local CSV/Parquet) to load, join onto the results and offer to --model; see sources.load_registry')
+    parser.add_argument('--model', action = 'store_true', help = 'also fit life expectancy on expenditure, income and obesity at once and score every covariate subset by cross-validation')
+    parser.add_argument('--covariates', default = '', help = 'comma-separated extra result columns for --model')
+    parser.add_argument('--ridge', type = float, default = 0.0, metavar = 'ALPHA', help = 'ridge penalty on the standardized covariates for --model (default: 0, least squares)')
+    parser.add_argument('--cv-folds', type = int, default = 5, help = 'cross-validation folds for --model (default: %(default)s)')
+    parser.add_argument('--sweep', action = 'store_true', help = 'also refit the trends over leave-k-out, random and regional country subsets and write per-country residual and rank stability (sweep_countries) and per-design slope and ranking stability (sweep_designs)')
+    parser.add_argument('--leave-out', default = ','.join(map(str, DEFAULT_LEAVE_OUT)), metavar = 'K,...', help = 'numbers of countries --sweep leaves out, every combination of each (default: %(default)s)')
+    parser.add_argument('--sweep-samples', type = int, default = DEFAULT_SAMPLES, metavar = 'N', help = 'random subsets for --sweep (default: %(default)s)')
+    parser.add_argument('--sweep-fraction', type = float, default = DEFAULT_FRACTION, help = 'share of the countries each random subset keeps (default: %(default)s)')
+    parser.add_argument('--no-charts', action = 'store_true', help = 'skip chart rendering')
+    parser.add_argument('--formats', default = ','.join(FORMATS), help = 'comma-separated chart formats written to <output dir>/charts/, e.g. png,svg,pdf (default: %(default)s)')
+    parser.add_argument('--workers', type = int, help = 'chart rendering and --sweep processes (default: one per CPU)')
+    parser.add_argument('--show', action = 'store_true', help = 'open the charts in a window when done')
+    parser.add_argument('--trace', nargs = '?', const = 'trace.json', metavar = 'FILE', help = 'time every stage, loader, step and chart (wall, CPU, peak memory, rows), print a summary and write a JSON report to FILE in the output dir (default: %(const)s)')
+    parser.add_argument('--profile', metavar = 'DIR', help = 'with --trace, also dump a cProfile per stage and chart into DIR')
+    args = parser.parse_args(argv)
+
+    configure(cache_dir = args.cache_dir, offline = args.offline or None, source_base_url = args.base_url, results_dir = args.output_dir, all_countries = args.all_countries or None)
+    formats = [fmt.strip() for fmt in args.formats.split(',') if fmt.strip()]
+    export_formats = [fmt.strip() for fmt in args.export_formats.split(',') if fmt.strip()]
+    if args.sources:
+        load_registry(args.sources)
+    covariates = [column.strip() for column in args.covariates.split(',') if column.strip()]
+    pipeline = build_pipeline(charts = not args.no_charts, resamples = args.bootstrap, seed = args.seed, panel = args.panel, formats = formats, workers = args.workers, export_formats = export_formats,
+                              model = args.model, covariates = covariates, alpha = args.ridge, folds = args.cv_folds,
+                              sweep = args.sweep, leave_out = [int(k) for k in args.leave_out.split(',') if k.strip()], samples = args.sweep_samples, fraction = args.sweep_fraction)
+    if args.trace or args.profile:
+        with tracing(Tracer(profile_dir = args.profile)) as tracer:
+            outputs = pipeline.run()
+    else:
+        outputs = pipeline.run()
+    for line in unmatched_countries(pipeline, outputs):
+        print(line, file = sys.stderr)
+
+    if not args.no_charts:
+        print(report(outputs['charts'] + outputs.get('panel_charts', [])))
+        if args.show:
+            import matplotlib.pyplot as plt
+            from . import charts
+            for chart, source in CHARTS.items():
+                getattr(charts, chart)(outputs[source], plt.figure())
+            plt.show()
+
+    if args.trace or args.profile:
+        print(summary_table(tracer))
+        print(f"trace: {write_report(tracer, os.path.join(output_dir, args.trace or 'trace.json'))}")
+    return outputs['results']
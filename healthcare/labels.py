@@ -0,0 +1,170 @@
+from functools import lru_cache
+from collections import defaultdict
+
+import numpy as np
+from matplotlib import rcParams
+from matplotlib.collections import PathCollection
+from matplotlib.font_manager import FontProperties
+from matplotlib.path import Path
+from matplotlib.textpath import TextPath, text_to_path
+from matplotlib.transforms import Affine2D
+
+#### Candidate label positions around a point, in order of preference; the outer ring is a fallback for crowded spots ####
+CANDIDATES = [(1, 0), (-1, 0), (1, -1), (-1, -1), (1, 1), (-1, 1), (0, -1), (0, 1),
+              (1, -2), (-1, -2), (1, 2), (-1, 2), (0, -2), (0, 2)]
+
+#### Gap between a marker's edge and its label, and the clearance kept around each label, in points ####
+PADDING = 2
+MARGIN = 1
+
+##############################
+###### Spatial grid index ####
+##############################
+
+# Boxes (x0, y0, x1, y1) bucketed into square cells, so an overlap query only looks
+# at the boxes sharing a cell with it instead of every box placed so far.
+class _Grid:
+    def __init__(self, cell):
+        self.cell = cell
+        self.cells = defaultdict(list)
+
+    def _keys(self, box):
+        x0, y0, x1, y1 = (int(np.floor(v / self.cell)) for v in box)
+        return [(i, j) for i in range(x0, x1 + 1) for j in range(y0, y1 + 1)]
+
+    def add(self, box):
+        for key in self._keys(box):
+            self.cells[key].append(box)
+
+    #### Total area of the indexed boxes overlapping `box`, counted up to `limit` ####
+    def overlap(self, box, limit = np.inf):
+        seen, area = set(), 0.0
+        for key in self._keys(box):
+            for other in self.cells.get(key, ()):
+                if id(other) in seen:
+                    continue
+                seen.add(id(other))
+                width = min(box[2], other[2]) - max(box[0], other[0])
+                height = min(box[3], other[3]) - max(box[1], other[1])
+                if width > 0 and height > 0:
+                    area += width * height
+                    if area >= limit:
+                        return area
+        return area
+
+##############################
+####### Label placement ######
+##############################
+
+#### A label's glyph outlines and width in points, kept per (text, size, family): charts reuse the same country names ####
+@lru_cache(maxsize = 4096)
+def _outline(label, size, family):
+    font = FontProperties(family = list(family), size = size)
+    path = TextPath((0, 0), label, prop = font)
+    width = text_to_path.get_text_width_height_descent(label, font, ismath = False)[0]
+    return path.vertices, path.codes, width
+
+def _font(fontsize):
+    return FontProperties(size = fontsize or rcParams['font.size'])
+
+def _box(px, py, width, height, gap, dx, dy):
+    x0 = px + dx * gap if dx > 0 else px + dx * gap - width if dx < 0 else px - width / 2
+    y0 = py + dy * gap if dy > 0 else py + dy * gap - height if dy < 0 else py - height / 2
+    return (x0 - MARGIN, y0 - MARGIN, x0 + width + MARGIN, y0 + height + MARGIN)
+
+#### Points with the most markers in their neighbourhood are labelled first ####
+def _crowding(grid, points, width, height):
+    return np.array([grid.overlap((px - width, py - height, px + width, py + height)) for px, py in points])
+
+# Greedy layout, most crowded points first: each label takes the first candidate
+# spot that overlaps no marker, no label placed before it and stays inside the axes;
+# failing that, the spot with the least overlap. Positions are worked out in points
+# from the axes' current limits, so call it after the data and limits are set; any
+# autoscaling matplotlib still has pending is applied first (reading the limits does
+# that), or the layout would use the limits from before the last plotted data.
+# Returns the offset in points and (dx, dy) side of each finite point's label, by index.
+def layout_labels(ax, x, y, labels, fontsize = None, marker_size = None):
+    x, y = np.asarray(x, dtype = float), np.asarray(y, dtype = float)
+    keep = np.isfinite(x) & np.isfinite(y)
+    ax.get_xlim()
+    ax.get_ylim()
+
+    scale = 72 / ax.figure.dpi
+    points = ax.transData.transform(np.column_stack([x, y])) * scale
+    bounds = ax.bbox.extents * scale
+    font = _font(fontsize)
+    #### Labels are one line tall, measured like matplotlib's Text does with 'lp' ####
+    _, line_height, _ = text_to_path.get_text_width_height_descent('lp', font, ismath = False)
+    family = tuple(font.get_family())
+    sizes = [(_outline(label, font.get_size(), family)[2], line_height) for label in labels]
+    radius = (marker_size or rcParams['lines.markersize']) / 2
+    gap = radius + PADDING
+
+    grid = _Grid(2 * line_height)
+    for px, py in points[keep]:
+        grid.add((px - radius, py - radius, px + radius, py + radius))
+
+    indices = np.flatnonzero(keep)
+    order = indices[np.argsort(-_crowding(grid, points[indices], 2 * line_height, 2 * gap), kind = 'stable')]
+
+    sides = {}
+    for i in order:
+        width, height = sizes[i]
+        px, py = points[i]
+        best = None
+        for dx, dy in CANDIDATES:
+            box = _box(px, py, width, height, gap, dx, dy)
+            outside = max(bounds[0] - box[0], 0) + max(box[2] - bounds[2], 0) + max(bounds[1] - box[1], 0) + max(box[3] - bounds[3], 0)
+            score = outside * height
+            score += grid.overlap(box, np.inf if best is None else best[0] - score)
+            if best is None or score < best[0]:
+                best = (score, box, dx, dy)
+            if score == 0:
+                break
+
+        _, box, dx, dy = best
+        grid.add(box)
+        sides[i] = (dx, dy)
+    return gap, sides
+
+#### One annotation per label, in input order ####
+def place_labels(ax, x, y, labels, fontsize = None, marker_size = None, **kwargs):
+    labels = [str(label) for label in labels]
+    x, y = np.asarray(x, dtype = float), np.asarray(y, dtype = float)
+    gap, sides = layout_labels(ax, x, y, labels, fontsize, marker_size)
+    return [ax.annotate(
+                labels[i], (x[i], y[i]),
+                xytext = (dx * gap, dy * gap), textcoords = 'offset points',
+                ha = 'left' if dx > 0 else 'right' if dx < 0 else 'center',
+                va = 'bottom' if dy > 0 else 'top' if dy < 0 else 'center',
+                fontsize = fontsize, **kwargs)
+            for i, (dx, dy) in sorted(sides.items())]
+
+# The same layout drawn as a single artist: every label's glyph outlines, already
+# shifted to its side of the point in points, in one PathCollection anchored at the
+# data points. One draw call for all labels instead of one Text layout per label,
+# which is what keeps charts with hundreds of countries fast. Text is drawn as
+# outlines, so it is not selectable in SVG/PDF output.
+def draw_labels(ax, x, y, labels, fontsize = None, marker_size = None, color = None, alpha = None, zorder = 3):
+    labels = [str(label) for label in labels]
+    x, y = np.asarray(x, dtype = float), np.asarray(y, dtype = float)
+    gap, sides = layout_labels(ax, x, y, labels, fontsize, marker_size)
+    font = _font(fontsize)
+    _, line_height, descent = text_to_path.get_text_width_height_descent('lp', font, ismath = False)
+    family = tuple(font.get_family())
+
+    paths, offsets = [], []
+    for i, (dx, dy) in sorted(sides.items()):
+        vertices, codes, width = _outline(labels[i], font.get_size(), family)
+        left = dx * gap if dx > 0 else dx * gap - width if dx < 0 else -width / 2
+        bottom = dy * gap if dy > 0 else dy * gap - line_height if dy < 0 else -line_height / 2
+        paths.append(Path(vertices + (left, bottom + descent), codes))
+        offsets.append((x[i], y[i]))
+
+    #### Paths are in points; dpi_scale_trans follows the dpi a figure is saved at ####
+    collection = PathCollection(paths, offsets = np.array(offsets).reshape(-1, 2), offset_transform = ax.transData,
+                                transform = Affine2D().scale(1 / 72) + ax.figure.dpi_scale_trans,
+                                facecolors = color or rcParams['text.color'], edgecolors = 'none', alpha = alpha, zorder = zorder)
+    collection.set_clip_on(False)
+    ax.add_collection(collection, autolim = False)
+    return collection
@@ -0,0 +1,173 @@
+import itertools
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from .workers import run_tasks
+
+Model = namedtuple('Model', ['y', 'covariates', 'alpha', 'coefficients', 'intercept', 'fitted', 'residuals', 'r2', 'n', 'std_errors'])
+
+DEFAULT_FOLDS = 5
+
+##############################
+#### Sufficient statistics ###
+##############################
+
+# Z'Z for Z = [1, X, y]: row/column 0 holds n and the sums, the middle block X'X,
+# the last row/column X'y and y'y. Every fit below is solved from these (p+2)^2
+# numbers, and a fold's training statistics are the total minus the fold's own.
+def _moments(x, y):
+    z = np.column_stack([np.ones(len(y)), x, y])
+    return z.T @ z
+
+#### Centred cross-products: C_xx (p, p), C_xy (p,), C_yy, n and the means ####
+def _centred(moments):
+    n = moments[0, 0]
+    sums = moments[0, 1:]
+    centred = moments[1:, 1:] - np.outer(sums, sums) / n
+    return centred[:-1, :-1], centred[:-1, -1], centred[-1, -1], n, sums / n
+
+# Solve every covariate set of one size at once. sets is an (m, k) array of column
+# indices; alpha is a ridge penalty on the standardized covariates (unit variance),
+# so 0 gives ordinary least squares and the penalty does not depend on units.
+# pinv keeps a collinear set from failing the whole batch. Returns the (m, k)
+# slopes, (m,) intercepts and the (m, k, k) inverses used for standard errors.
+def _solve(moments, sets, alpha):
+    cxx, cxy, _, n, means = _centred(moments)
+    a = cxx[sets[:, :, None], sets[:, None, :]]
+    if alpha:
+        a = a + alpha * np.einsum('mk,kj->mkj', np.diagonal(cxx)[sets] / n, np.eye(sets.shape[1]))
+    inverse = np.linalg.pinv(a)
+    slopes = np.einsum('mkj,mj->mk', inverse, cxy[sets])
+    intercepts = means[-1] - (slopes * means[sets]).sum(axis = 1)
+    return slopes, intercepts, inverse
+
+#### In-sample residual sum of squares of each solved set, from the moments alone ####
+def _rss(moments, sets, slopes):
+    cxx, cxy, cyy, _, _ = _centred(moments)
+    a = cxx[sets[:, :, None], sets[:, None, :]]
+    return cyy - 2 * (slopes * cxy[sets]).sum(axis = 1) + np.einsum('mk,mkj,mj->m', slopes, a, slopes)
+
+def _complete(frame, y, columns):
+    values = frame[list(columns) + [y]].apply(pd.to_numeric, errors = 'coerce').to_numpy(dtype = float)
+    rows = np.isfinite(values).all(axis = 1)
+    return values[rows, :-1], values[rows, -1], rows
+
+##############################
+######### Single fit #########
+##############################
+
+# Least squares (ridge when alpha > 0) of y on all the covariates at once, over the
+# rows where every one of them is present. fitted and residuals come back aligned
+# with the frame (NaN on incomplete rows), coefficients and std_errors as Series
+# indexed by covariate.
+def fit_model(frame, y, covariates, alpha = 0.0):
+    covariates = list(covariates)
+    x, ys, rows = _complete(frame, y, covariates)
+    moments = _moments(x, ys)
+    sets = np.arange(len(covariates))[None, :]
+    slopes, intercepts, inverse = _solve(moments, sets, alpha)
+    rss = _rss(moments, sets, slopes)[0]
+    n = int(rows.sum())
+
+    #### Var(b) = sigma^2 A^-1 C_xx A^-1, which is sigma^2 (X'X)^-1 for plain least squares ####
+    cxx, _, cyy, _, _ = _centred(moments)
+    with np.errstate(invalid = 'ignore', divide = 'ignore'):
+        sigma2 = rss / (n - len(covariates) - 1)
+        std_errors = np.sqrt(np.diagonal(sigma2 * inverse[0] @ cxx @ inverse[0]))
+        r2 = 1 - rss / cyy
+
+    fitted = np.full(len(frame), np.nan)
+    fitted[rows] = intercepts[0] + x @ slopes[0]
+    fitted = pd.Series(fitted, index = frame.index, name = f'{y}_Model')
+    residuals = (frame[y].astype(float) - fitted).rename(f'{y}_Adjusted')
+    return Model(y, covariates, alpha, pd.Series(slopes[0], index = covariates), intercepts[0], fitted, residuals, r2, n,
+                 pd.Series(std_errors, index = covariates))
+
+#### One row per covariate: coefficient, standard error, t and the effect of a one-SD change ####
+def coefficient_table(model, frame = None):
+    table = pd.DataFrame({
+        'y': model.y,
+        'covariate': model.covariates,
+        'alpha': model.alpha,
+        'coefficient': model.coefficients.to_numpy(),
+        'std_error': model.std_errors.to_numpy(),
+    })
+    with np.errstate(invalid = 'ignore', divide = 'ignore'):
+        table['t'] = table['coefficient'] / table['std_error']
+    if frame is not None:
+        rows = model.fitted.notna()
+        table['per_sd'] = table['coefficient'] * frame.loc[rows, model.covariates].astype(float).std(ddof = 0).to_numpy()
+    intercept = pd.DataFrame({'y': [model.y], 'covariate': ['(intercept)'], 'alpha': [model.alpha], 'coefficient': [model.intercept]})
+    return pd.concat([intercept, table], ignore_index = True)
+
+##############################
+#### Covariate set search ####
+##############################
+
+#### Every non-empty subset of the candidates, smallest first ####
+def covariate_sets(candidates, max_size = None):
+    max_size = min(max_size or len(candidates), len(candidates))
+    return [combo for k in range(1, max_size + 1) for combo in itertools.combinations(candidates, k)]
+
+#### Held-out squared error of every (set, alpha) on one fold, training on the other folds' moments ####
+def _fold_errors(train, x, y, groups, alphas):
+    errors = {}
+    for k, sets in groups.items():
+        for alpha in alphas:
+            slopes, intercepts, _ = _solve(train, sets, alpha)
+            predicted = intercepts[:, None] + np.einsum('mk,nmk->mn', slopes, x[:, sets])
+            errors[k, alpha] = ((predicted - y) ** 2).sum(axis = 1)
+    return errors
+
+# Fit y on every covariate set (default: every subset of the candidates up to
+# max_size) for every ridge alpha, and score each by in-sample R^2, adjusted R^2
+# and k-fold cross-validated RMSE. All sets use the same rows -- those complete in
+# every candidate -- so their scores are comparable. Sets of one size are solved as
+# one batch from the fold's moments; with more than one worker the folds run in
+# their own processes. Fold assignment depends only on `seed`. Best (lowest CV
+# error) first.
+def evaluate_covariate_sets(frame, y, candidates, sets = None, max_size = None, alpha = 0.0, folds = DEFAULT_FOLDS, seed = 0, workers = None):
+    candidates = list(candidates)
+    sets = [tuple(s) for s in sets] if sets is not None else covariate_sets(candidates, max_size)
+    alphas = [float(a) for a in np.atleast_1d(alpha)]
+    position = {column: i for i, column in enumerate(candidates)}
+    x, ys, _ = _complete(frame, y, candidates)
+    n = len(ys)
+
+    groups = {}
+    for s in sets:
+        groups.setdefault(len(s), []).append([position[column] for column in s])
+    groups = {k: np.array(members, dtype = int) for k, members in groups.items()}
+
+    total = _moments(x, ys)
+    folds = min(folds, n)
+    fold = np.random.default_rng(seed).permutation(n) % folds if folds > 1 else np.zeros(n, dtype = int)
+    tasks = []
+    for f in range(folds if folds > 1 else 0):
+        held = fold == f
+        tasks.append((total - _moments(x[held], ys[held]), x[held], ys[held], groups, alphas))
+
+    fold_errors = run_tasks(_fold_errors, tasks, workers)
+
+    _, _, cyy, _, _ = _centred(total)
+    tables = []
+    for k, members in groups.items():
+        for alpha in alphas:
+            slopes, _, _ = _solve(total, members, alpha)
+            rss = _rss(total, members, slopes)
+            with np.errstate(invalid = 'ignore', divide = 'ignore'):
+                r2 = 1 - rss / cyy
+                adjusted = 1 - (1 - r2) * (n - 1) / (n - k - 1)
+                cv_rmse = np.sqrt(sum(errors[k, alpha] for errors in fold_errors) / n) if fold_errors else np.full(len(members), np.nan)
+            tables.append(pd.DataFrame({
+                'covariates': [' + '.join(candidates[i] for i in row) for row in members],
+                'k': k,
+                'alpha': alpha,
+                'n': n,
+                'r2': r2,
+                'adj_r2': adjusted,
+                'cv_rmse': cv_rmse,
+            }))
+    return pd.concat(tables, ignore_index = True).sort_values(['cv_rmse', 'k'], ignore_index = True)
@@ -0,0 +1,73 @@
+import re
+
+import pandas as pd
+
+from .countries import country_names, join_countries
+from .export import FORMATS, export_tables
+from .regression import fit_groups
+from .schemas import SchemaError, to_number
+
+_YEAR = re.compile(r'^\s*(\d{4})')
+
+##############################
+######## Panel frames ########
+##############################
+
+#### Columns whose header starts with a year, e.g. '2022' or '2022* (USD PPP)[1]' ####
+def year_columns(frame):
+    return {column: int(_YEAR.match(str(column)).group(1)) for column in frame.columns if _YEAR.match(str(column))}
+
+#### The column for one year, whatever footnotes or units its header carries ####
+def year_column(frame, year):
+    columns = [column for column, column_year in year_columns(frame).items() if column_year == year]
+    if not columns:
+        raise SchemaError(f'no column for {year} (columns: {list(frame.columns)})')
+    return columns[0]
+
+#### Wide table with one column per year -> Country, Year, <value> rows ####
+def to_long(frame, value, country = 'Country'):
+    years = year_columns(frame)
+    long = frame[[country] + list(years)].rename(columns = years).melt(id_vars = country, var_name = 'Year', value_name = value)
+    long['Year'] = long['Year'].astype(int)
+    long[value] = to_number(long[value])
+    return long.dropna(subset = [value]).reset_index(drop = True)
+
+# Country x year panel of every indicator, joined on country code and year. Sources
+# given as (country, value) snapshots have no year dimension in their tables, so
+# their value applies to every panel year.
+def build_panel(by_year, snapshots):
+    panel = None
+    for frame in by_year:
+        frame = frame.drop(columns = 'Country')
+        panel = frame if panel is None else join_countries(panel, frame, how = 'outer')
+    for frame in snapshots:
+        panel = join_countries(panel, frame)
+    panel.insert(0, 'Country', pd.Categorical(country_names(panel['Code'])))
+    return panel.sort_values(['Year', 'Country'], ignore_index = True)
+
+##############################
+##### Per-year metrics #######
+##############################
+
+#### The single-year derived columns, computed for every year at once ####
+def panel_metrics(panel):
+    panel = panel.copy()
+    panel['Expenditure_As_Percent_of_Income'] = (panel['Expenditure']/panel['Disposable_Income'])*100
+
+    reg_expenditure_by_income = fit_groups(panel, 'Year', 'Disposable_Income', 'Expenditure_As_Percent_of_Income')
+    panel['Expenditure_As_Percent_of_Income_Trend'] = reg_expenditure_by_income.trend
+    panel['Excess_Expenditure_as_Percent'] = reg_expenditure_by_income.residuals
+
+    reg_life_expectancy_vs_obesity_rate = fit_groups(panel, 'Year', 'Obesity_Rate', 'Life_Expectancy')
+    panel['Life_Expectancy_Trend'] = reg_life_expectancy_vs_obesity_rate.trend
+    panel['Years_Added'] = reg_life_expectancy_vs_obesity_rate.residuals
+
+    panel['Excess_Disposable_Income'] = panel['Disposable_Income'] - panel['Expenditure']
+    return panel
+
+#### Long panel plus one healthcare_<year> result table per year ####
+def export_panel(panel, directory, formats = FORMATS):
+    tables = {'healthcare_panel': panel}
+    for year, table in panel.groupby('Year', observed = True):
+        tables[f'healthcare_{year}'] = table.drop(columns = 'Year').reset_index(drop = True)
+    return export_tables(tables, directory, formats)
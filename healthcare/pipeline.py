@@ -0,0 +1,154 @@
+import os
+import pickle
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from .cache import DEFAULT_CACHE_DIR
+from .files import atomic_path, remove_stale
+from .fingerprints import hash_text, hash_code, hash_value
+from .tracing import traced
+
+class PipelineError(RuntimeError):
+    pass
+
+##############################
+######## Stage graph #########
+##############################
+
+# A stage is a function of the outputs of its named inputs. Its key hashes its own
+# code, the package code it reaches (the helpers it calls: fits, joins, models; see
+# fingerprints.hash_code) and the output hashes of its inputs, so an edited formula re-runs the stages, one changed
+# source only re-runs the stages downstream of it, and a stage whose output comes
+# out identical stops the change from propagating further.
+#
+# volatile  - always runs (source loaders; their own caches keep that cheap)
+# persist   - outputs are pickled under the cache directory and reused across runs
+# parallel  - may run on the worker pool; False keeps it on the calling thread (pyplot)
+# params    - keyword arguments for func, part of the key like the inputs
+class Stage:
+    def __init__(self, name, func, inputs = (), volatile = False, persist = True, parallel = True, params = None):
+        self.name = name
+        self.func = func
+        self.inputs = tuple(inputs)
+        self.volatile = volatile
+        self.persist = persist and not volatile
+        self.parallel = parallel
+        self.params = dict(params or {})
+        self.version = hash_code(func)
+
+    def key(self, input_hashes):
+        return hash_text(self.name, self.version, repr(sorted(self.params.items())), *input_hashes)
+
+class Pipeline:
+    def __init__(self, directory = None, max_workers = None):
+        self.root = directory or DEFAULT_CACHE_DIR
+        self.max_workers = max_workers
+        self.stages = {}
+        self.last_run = {}
+        self._memo = {}
+        self._lock = threading.Lock()
+
+    @property
+    def directory(self):
+        return os.path.join(self.root, 'stages')
+
+    def add(self, name, func, inputs = (), **options):
+        missing = [i for i in inputs if i not in self.stages]
+        if missing:
+            raise PipelineError(f'stage {name!r} depends on undeclared stages {missing}')
+        self.stages[name] = Stage(name, func, inputs, **options)
+        return func
+
+    #### Decorator form of add ####
+    def stage(self, name, inputs = (), **options):
+        return lambda func: self.add(name, func, inputs, **options)
+
+    def downstream(self, name):
+        names = {name}
+        for stage in self.stages.values():
+            if names.intersection(stage.inputs):
+                names.add(stage.name)
+        return names
+
+    def _upstream(self, targets):
+        needed, stack = set(), list(targets)
+        while stack:
+            name = stack.pop()
+            if name not in self.stages:
+                raise PipelineError(f'unknown stage {name!r}')
+            if name not in needed:
+                needed.add(name)
+                stack.extend(self.stages[name].inputs)
+        return needed
+
+    #### Run the targets (default: every stage) and return {stage name: output} ####
+    def run(self, targets = None):
+        needed = self._upstream(targets or self.stages)
+        pending = [name for name in self.stages if name in needed]
+        done, running, serial = {}, {}, []
+        self.last_run = {}
+
+        with ThreadPoolExecutor(max_workers = self.max_workers) as pool:
+            while pending or running or serial:
+                for name in [n for n in pending if all(i in done for i in self.stages[n].inputs)]:
+                    pending.remove(name)
+                    stage = self.stages[name]
+                    if stage.parallel:
+                        running[pool.submit(self._execute, stage, done)] = name
+                    else:
+                        serial.append(name)
+
+                if serial:
+                    name = serial.pop(0)
+                    done[name] = self._execute(self.stages[name], done)
+                    continue
+                finished, _ = wait(running, return_when = FIRST_COMPLETED)
+                for future in finished:
+                    done[running.pop(future)] = future.result()
+
+        return {name: output for name, (output, _) in done.items()}
+
+    def _execute(self, stage, done):
+        inputs = [done[name] for name in stage.inputs]
+        key = stage.key([output_hash for _, output_hash in inputs])
+
+        if not stage.volatile:
+            with self._lock:
+                memo = self._memo.get(stage.name)
+            if memo is not None and memo[0] == key:
+                self.last_run[stage.name] = 'memo'
+                return memo[1]
+            if stage.persist:
+                stored = self._load(stage.name, key)
+                if stored is not None:
+                    self.last_run[stage.name] = 'stored'
+                    with self._lock:
+                        self._memo[stage.name] = (key, stored)
+                    return stored
+
+        output = traced('stage', stage.name)(stage.func)(*[value for value, _ in inputs], **stage.params)
+        result = (output, hash_value(output) or key)
+        self.last_run[stage.name] = 'computed'
+        with self._lock:
+            self._memo[stage.name] = (key, result)
+        if stage.persist:
+            self._save(stage.name, key, result)
+        return result
+
+    def _path(self, name, key):
+        return os.path.join(self.directory, f'{name}-{key}.pkl')
+
+    def _load(self, name, key):
+        try:
+            with open(self._path(name, key), 'rb') as f:
+                return pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return None
+
+    def _save(self, name, key, result):
+        os.makedirs(self.directory, exist_ok = True)
+        path = self._path(name, key)
+        with atomic_path(path) as tmp:
+            with open(tmp, 'wb') as f:
+                pickle.dump(result, f, protocol = pickle.HIGHEST_PROTOCOL)
+        remove_stale(self._path(name, '*'), path)
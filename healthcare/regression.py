@@ -0,0 +1,110 @@
+import itertools
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+LineFit = namedtuple('LineFit', ['slope', 'intercept', 'trend', 'residuals', 'r2', 'n'])
+
+##############################
+##### Closed-form OLS fits ###
+##############################
+
+# Single-feature least squares y = intercept + slope * x for many (x, y) column pairs
+# at once. x and y are (n,) or (n, k) arrays; each of the k columns is an independent
+# fit over the rows where both values are present. trend and residuals come back in
+# the input's shape (NaN where a row was missing), the coefficients as length-k arrays
+# (scalars for 1-D input).
+def fit_lines(x, y):
+    x = np.asarray(x, dtype = float)
+    y = np.asarray(y, dtype = float)
+    squeeze = x.ndim == 1 and y.ndim == 1
+    x, y = np.broadcast_arrays(np.atleast_2d(x.T).T, np.atleast_2d(y.T).T)
+
+    present = np.isfinite(x) & np.isfinite(y)
+    n = present.sum(axis = 0)
+    xs, ys = np.where(present, x, 0.0), np.where(present, y, 0.0)
+    with np.errstate(invalid = 'ignore', divide = 'ignore'):
+        mean_x, mean_y = xs.sum(axis = 0) / n, ys.sum(axis = 0) / n
+        dx = np.where(present, x - mean_x, 0.0)
+        dy = np.where(present, y - mean_y, 0.0)
+        sxx, syy, sxy = (dx * dx).sum(axis = 0), (dy * dy).sum(axis = 0), (dx * dy).sum(axis = 0)
+
+        slope = sxy / sxx
+        intercept = mean_y - slope * mean_x
+        trend = intercept + slope * x
+        residuals = y - trend
+        ss_residual = (np.where(present, residuals, 0.0) ** 2).sum(axis = 0)
+        r2 = 1 - ss_residual / syy
+
+    if squeeze:
+        return LineFit(slope[0], intercept[0], trend[:, 0], residuals[:, 0], r2[0], int(n[0]))
+    return LineFit(slope, intercept, trend, residuals, r2, n)
+
+#### Fit several (x column, y column) pairs of a frame in one batch ####
+def fit_columns(frame, pairs):
+    xs = frame[[x for x, _ in pairs]].to_numpy(dtype = float)
+    ys = frame[[y for _, y in pairs]].to_numpy(dtype = float)
+    return fit_lines(xs, ys)
+
+##############################
+###### Pairwise screening ####
+##############################
+
+# Every ordered pair of indicator columns fitted at once from pairwise sufficient
+# statistics: with M the presence mask and X the zero-filled values, M'M, X'M, (X*X)'M
+# and X'X give n, sum x, sum x^2 and sum xy for every pair in four matrix products.
+def screen_pairs(frame, columns = None):
+    columns = list(columns) if columns is not None else list(frame.select_dtypes('number').columns)
+    values = frame[columns].to_numpy(dtype = float)
+    present = np.isfinite(values).astype(float)
+    values = np.where(present > 0, values, 0.0)
+
+    n = present.T @ present
+    sum_x = values.T @ present
+    sum_xx = (values * values).T @ present
+    sum_xy = values.T @ values
+    sum_y, sum_yy = sum_x.T, sum_xx.T
+
+    with np.errstate(invalid = 'ignore', divide = 'ignore'):
+        cov = n * sum_xy - sum_x * sum_y
+        var_x = n * sum_xx - sum_x ** 2
+        var_y = n * sum_yy - sum_y ** 2
+        slope = cov / var_x
+        intercept = (sum_y - slope * sum_x) / n
+        r2 = cov ** 2 / (var_x * var_y)
+
+    i, j = np.array([(a, b) for a, b in itertools.permutations(range(len(columns)), 2)], dtype = int).reshape(-1, 2).T
+    screen = pd.DataFrame({
+        'x': np.array(columns, dtype = object)[i],
+        'y': np.array(columns, dtype = object)[j],
+        'n': n[i, j].astype(int),
+        'slope': slope[i, j],
+        'intercept': intercept[i, j],
+        'r2': r2[i, j],
+    })
+    return screen.sort_values('r2', ascending = False, ignore_index = True)
+
+##############################
+####### Grouped fits #########
+##############################
+
+# One fit per group (e.g. per year of a panel) from grouped sums, with no Python loop
+# over groups. trend and residuals come back aligned with the frame's rows; the
+# coefficients as Series indexed by group.
+def fit_groups(frame, by, x, y):
+    keys = frame[by]
+    present = frame[x].notna() & frame[y].notna()
+    xs, ys = frame[x].where(present).astype(float), frame[y].where(present).astype(float)
+    dx = xs - xs.groupby(keys).transform('mean')
+    dy = ys - ys.groupby(keys).transform('mean')
+
+    sums = pd.DataFrame({'n': present.astype(int), 'x': xs, 'y': ys, 'xx': dx * dx, 'yy': dy * dy, 'xy': dx * dy}).groupby(keys).sum()
+    with np.errstate(invalid = 'ignore', divide = 'ignore'):
+        slope = sums['xy'] / sums['xx']
+        intercept = sums['y'] / sums['n'] - slope * sums['x'] / sums['n']
+        r2 = sums['xy'] ** 2 / (sums['xx'] * sums['yy'])
+
+    trend = keys.map(intercept) + keys.map(slope) * frame[x]
+    residuals = frame[y] - trend
+    return LineFit(slope, intercept, trend, residuals, r2, sums['n'])
@@ -0,0 +1,66 @@
+import os
+import time
+import contextlib
+
+from .files import atomic_path
+from .tracing import Tracer, active, tracing
+from .workers import run_tasks
+
+FORMATS = ('png',)
+
+##############################
+###### Headless rendering ####
+##############################
+
+#### Workers render with Agg and never open a window ####
+def _init_worker():
+    import matplotlib
+    matplotlib.use('Agg')
+
+# Draw one chart, save it once per format into directory/<tag>/ (written to a
+# temporary name and renamed), then drop the figure. Returns the chart's timing record.
+# trace is a (memory, profile_dir) pair for a worker process to trace its chart with;
+# the spans come back in the record's 'spans'.
+def render_chart(name, healthcare, directory, formats = FORMATS, tag = None, dpi = None, trace = None):
+    if trace is not None and active() is None:
+        with tracing(Tracer(*trace)) as tracer:
+            record = render_chart(name, healthcare, directory, formats, tag, dpi)
+        return dict(record, spans = tracer.spans)
+
+    from . import charts
+    tracer = active()
+    start, cpu = time.perf_counter(), time.process_time()
+
+    directory = os.path.join(directory, str(tag)) if tag is not None else directory
+    os.makedirs(directory, exist_ok = True)
+    fig = getattr(charts, name)(healthcare)
+    paths = []
+    for fmt in formats:
+        path = os.path.join(directory, f'{name}.{fmt}')
+        with tracer.span(f'{name}.{fmt}', 'save') if tracer else contextlib.nullcontext(), atomic_path(path) as tmp:
+            charts.save_figure(fig, tmp, fmt, dpi)
+        paths.append(path)
+    fig.clear()
+
+    return {'chart': name, 'tag': tag, 'seconds': time.perf_counter() - start, 'cpu_seconds': time.process_time() - cpu, 'files': paths}
+
+# jobs are (chart name, frame, tag) triples, e.g. every chart for every panel year.
+# With more than one worker each chart renders in its own process, so a large batch
+# scales with cores; records come back in job order.
+def render_charts(jobs, directory, formats = FORMATS, workers = None, dpi = None):
+    tracer = active()
+    trace = (tracer.memory, tracer.profile_dir) if tracer else None
+    records = run_tasks(render_chart, [(name, frame, directory, formats, tag, dpi, trace) for name, frame, tag in jobs], workers, _init_worker)
+    for record in records:
+        if 'spans' in record:
+            tracer.add(record.pop('spans'))
+    return records
+
+#### One line per chart, slowest first ####
+def report(timings):
+    lines = []
+    for record in sorted(timings, key = lambda record: -record['seconds']):
+        chart = record['chart'] if record['tag'] is None else f"{record['tag']}/{record['chart']}"
+        lines.append(f"{chart:<60} {record['seconds'] * 1000:8.1f} ms  {len(record['files'])} file(s)")
+    lines.append(f"{'total (sum of charts)':<60} {sum(record['seconds'] for record in timings) * 1000:8.1f} ms")
+    return '\n'.join(lines)
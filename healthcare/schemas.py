@@ -0,0 +1,110 @@
+import re
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+#### Cells that mean "no value" rather than a broken number ####
+PLACEHOLDERS = {'', '—', '–', '-', '..', 'n/a', 'N/A', 'NA', 'nan'}
+
+#### Wikipedia tables write negative values with the Unicode minus sign (U+2212) ####
+_NUMBER = re.compile(r'^\s*([-\u2212]?[\d,]*\.?\d+)')
+
+# dtype is a pandas dtype name; 'category' and 'string' (Arrow-backed) columns are
+# labels, everything else numeric with an inclusive [low, high] range.
+Column = namedtuple('Column', ['name', 'dtype', 'unit', 'low', 'high'], defaults = [None, None, None])
+
+class SchemaError(ValueError):
+    pass
+
+##############################
+####### Source schemas #######
+##############################
+
+COUNTRY = Column('Country', 'category')
+CODE = Column('Code', 'int32', 'ISO 3166-1 numeric, or registered (1000+)', 1)
+YEAR = Column('Year', 'int16', 'year', 1900, 2100)
+
+EXPENDITURE = Column('Expenditure', 'float32', 'USD PPP per capita', 0, 25000)
+LIFE_EXPECTANCY = Column('Life_Expectancy', 'float32', 'years at birth', 30, 100)
+DISPOSABLE_INCOME = Column('Disposable_Income', 'float32', 'USD PPP per capita', 0, 200000)
+OBESITY_RATE = Column('Obesity_Rate', 'float32', 'percent of adults', 0, 100)
+
+SCHEMAS = {
+    'expenditure': [COUNTRY, CODE, EXPENDITURE],
+    'life_expectancy': [COUNTRY, CODE, LIFE_EXPECTANCY],
+    'disposable_income': [COUNTRY, CODE, DISPOSABLE_INCOME],
+    'obesity_rate': [COUNTRY, CODE, OBESITY_RATE],
+    'expenditure_panel': [COUNTRY, CODE, YEAR, EXPENDITURE],
+    'disposable_income_panel': [COUNTRY, CODE, YEAR, DISPOSABLE_INCOME],
+}
+
+##############################
+######### Validation #########
+##############################
+
+#### Leading number of each cell: '23,100 (2021)' -> 23100.0, '−1.5' -> -1.5, '—' -> NaN ####
+def to_number(values):
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype(float)
+    numbers = values.astype(str).str.extract(_NUMBER)[0]
+    return pd.to_numeric(numbers.str.replace(',', '').str.replace('\u2212', '-'), errors = 'coerce')
+
+#### Cells holding something other than a missing-value placeholder ####
+def _given(values):
+    if pd.api.types.is_numeric_dtype(values):
+        return values.notna().to_numpy()
+    return (values.notna() & ~values.astype(str).str.strip().isin(PLACEHOLDERS)).to_numpy()
+
+def _examples(values, limit = 3):
+    values = list(dict.fromkeys(str(value) for value in values))
+    return ', '.join(repr(value) for value in values[:limit]) + (', ...' if len(values) > limit else '')
+
+def _dtype(column):
+    return pd.StringDtype('pyarrow') if column.dtype == 'string' else column.dtype
+
+# Check `frame` against the source's schema in one pass and return it compacted:
+# only the declared columns, in order, cast to their dtypes (categorical labels,
+# float32 metrics, Arrow strings) with the units in attrs['units']. Every problem
+# found -- missing columns, empty labels, text that is not a number, values out of
+# range -- is collected into a single SchemaError naming the source.
+def validate(frame, source, schema = None):
+    schema = schema or SCHEMAS[source]
+    problems = [f'missing column {column.name!r}' for column in schema if column.name not in frame]
+    if problems:
+        raise SchemaError(f"{source}: {'; '.join(problems)} (columns: {list(frame.columns)})")
+
+    labels = [column for column in schema if column.dtype in ('category', 'string')]
+    numbers = [column for column in schema if column not in labels]
+
+    for column in labels:
+        empty = frame[column.name].isna().to_numpy()
+        if empty.any():
+            problems.append(f'{column.name}: {empty.sum()} empty value(s)')
+
+    parsed = {column.name: to_number(frame[column.name]) for column in numbers}
+    values = np.column_stack([parsed[column.name].to_numpy(dtype = float) for column in numbers]) if numbers else np.empty((len(frame), 0))
+    raw = frame[[column.name for column in numbers]]
+    given = np.column_stack([_given(raw[column.name]) for column in numbers]) if numbers else np.empty((len(frame), 0), dtype = bool)
+    integer = np.array([np.dtype(column.dtype).kind in 'iu' for column in numbers], dtype = bool)
+
+    low = np.array([-np.inf if column.low is None else column.low for column in numbers], dtype = float)
+    high = np.array([np.inf if column.high is None else column.high for column in numbers], dtype = float)
+    unparsed = given & np.isnan(values)
+    absent = ~given & integer
+    with np.errstate(invalid = 'ignore'):
+        outside = (values < low) | (values > high)
+    for i in np.flatnonzero(unparsed.any(axis = 0) | absent.any(axis = 0) | outside.any(axis = 0)):
+        column = numbers[i]
+        if absent[:, i].any():
+            problems.append(f'{column.name}: {absent[:, i].sum()} empty value(s)')
+        if unparsed[:, i].any():
+            problems.append(f'{column.name}: {unparsed[:, i].sum()} non-numeric value(s) ({_examples(raw.iloc[unparsed[:, i], i])})')
+        if outside[:, i].any():
+            problems.append(f'{column.name}: {outside[:, i].sum()} value(s) outside [{column.low}, {column.high}] {column.unit} ({_examples(values[outside[:, i], i])})')
+    if problems:
+        raise SchemaError(f"{source}: {'; '.join(problems)}")
+
+    compact = pd.DataFrame({column.name: (parsed[column.name] if column in numbers else frame[column.name]).astype(_dtype(column)) for column in schema}, index = frame.index)
+    compact.attrs = dict(frame.attrs, units = {column.name: column.unit for column in schema if column.unit})
+    return compact
@@ -0,0 +1,320 @@
+import io
+import os
+import re
+import sys
+import json
+import argparse
+import threading
+import http.server
+import urllib.parse
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from .countries import country_codes
+from .export import EXTENSIONS, MANIFEST, json_ready, read_manifest
+
+#### Country groups a query can name, as ISO-3 codes ####
+GROUPS = {
+    'eu': ['AUT', 'BEL', 'BGR', 'HRV', 'CYP', 'CZE', 'DNK', 'EST', 'FIN', 'FRA', 'DEU', 'GRC', 'HUN', 'IRL', 'ITA', 'LVA', 'LTU',
+           'LUX', 'MLT', 'NLD', 'POL', 'PRT', 'ROU', 'SVK', 'SVN', 'ESP', 'SWE'],
+    'oecd': ['AUS', 'AUT', 'BEL', 'CAN', 'CHL', 'COL', 'CRI', 'CZE', 'DNK', 'EST', 'FIN', 'FRA', 'DEU', 'GRC', 'HUN', 'ISL', 'IRL',
+             'ISR', 'ITA', 'JPN', 'KOR', 'LVA', 'LTU', 'LUX', 'MEX', 'NLD', 'NZL', 'NOR', 'POL', 'PRT', 'SVK', 'SVN', 'ESP', 'SWE',
+             'CHE', 'TUR', 'GBR', 'USA'],
+}
+
+#### Tables served, in order of preference: the results with extra indicators, else the results ####
+TABLES = ('indicators', 'healthcare')
+
+#### Fastest format to load first ####
+READ_ORDER = ('parquet', 'csv', 'jsonl')
+
+CONTENT_TYPES = {'png': 'image/png', 'svg': 'image/svg+xml', 'pdf': 'application/pdf'}
+
+CHART_CACHE = 64
+
+_CONDITION = re.compile(r'^\s*(\w+)\s*(>=|<=|!=|=|>|<)\s*(.+?)\s*$')
+_OPERATORS = {'>': np.greater, '<': np.less, '>=': np.greater_equal, '<=': np.less_equal, '=': np.equal, '!=': np.not_equal}
+
+class QueryError(ValueError):
+    pass
+
+##############################
+######## Result store ########
+##############################
+
+# The exported results, loaded once and indexed by country code. Every request
+# first stats manifest.json; when the pipeline has rewritten it since the last load,
+# the table is read again and the chart cache emptied, so answers follow the latest
+# export without a restart.
+class ResultStore:
+    def __init__(self, directory, chart_cache = CHART_CACHE):
+        self.directory = directory
+        self.chart_cache = chart_cache
+        self.frame = None
+        self.table = None
+        self.version = None
+        self._charts = OrderedDict()
+        self._lock = threading.Lock()
+        self._render_lock = threading.Lock()
+
+    def _stamp(self):
+        try:
+            stat = os.stat(os.path.join(self.directory, MANIFEST))
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    #### Reload when the manifest changed; returns the current frame ####
+    def refresh(self):
+        stamp = self._stamp()
+        with self._lock:
+            if self.frame is None or stamp != self.version:
+                self.frame, self.table = self._load()
+                self.version = stamp
+                self._charts.clear()
+            return self.frame
+
+    def _load(self):
+        outputs = read_manifest(self.directory).get('outputs', {})
+        for table in TABLES:
+            for fmt in READ_ORDER:
+                filename = table + EXTENSIONS[fmt]
+                if filename in outputs:
+                    return _index(_read(os.path.join(self.directory, filename), fmt)), table
+        raise FileNotFoundError(f'no results in {os.path.join(self.directory, MANIFEST)} (run the analysis first)')
+
+    #### Rendered chart bytes, least recently used dropped first; `name` must pass chart_function ####
+    def chart(self, name, frame, fmt, dpi, highlight = None):
+        from . import charts
+        highlight = charts.HIGHLIGHT if highlight is None else tuple(highlight)
+        key = (name, fmt, dpi, tuple(frame.index), highlight, self.version)
+        with self._lock:
+            if key in self._charts:
+                self._charts.move_to_end(key)
+                return self._charts[key]
+
+        #### Figures are independent, but matplotlib's text and font caches are not thread-safe ####
+        with self._render_lock:
+            fig = chart_function(name)(frame.reset_index(drop = True), highlight = highlight)
+            buffer = io.BytesIO()
+            charts.save_figure(fig, buffer, fmt, dpi)
+            fig.clear()
+        data = buffer.getvalue()
+
+        with self._lock:
+            self._charts[key] = data
+            while len(self._charts) > self.chart_cache:
+                self._charts.popitem(last = False)
+        return data
+
+#### The chart drawing function called `name`, or None ####
+def chart_function(name):
+    from . import charts
+    return getattr(charts, name, None) if name.startswith('chart_') else None
+
+def _read(path, fmt):
+    if fmt == 'parquet':
+        return pd.read_parquet(path)
+    if fmt == 'jsonl':
+        return pd.read_json(path, lines = True)
+    return pd.read_csv(path)
+
+def _index(frame):
+    frame = frame.drop(columns = [column for column in frame.columns if str(column).startswith('Unnamed')])
+    if 'Code' not in frame:
+        frame.insert(1, 'Code', country_codes(frame['Country']))
+    frame = frame.dropna(subset = ['Code'])
+    frame['Code'] = frame['Code'].astype('int32')
+    #### Unnamed index, so Code stays usable as a sort key ####
+    frame.index = frame['Code'].to_numpy()
+    return frame
+
+##############################
+########### Queries ##########
+##############################
+
+def _names(values):
+    return [name.strip() for value in values for name in value.split(',') if name.strip()]
+
+#### Codes from countries= (names, aliases or ISO-3) and group= ####
+def _selection(params):
+    codes, names = [], _names(params.get('countries', []))
+    if names:
+        found = country_codes(names)
+        unknown = [name for name, code in zip(names, found) if pd.isna(code)]
+        if unknown:
+            raise QueryError(f'unknown countries: {", ".join(unknown)}')
+        codes.extend(int(code) for code in found)
+    for group in _names(params.get('group', [])):
+        if group.lower() not in GROUPS:
+            raise QueryError(f'unknown group {group!r} (choose from {sorted(GROUPS)})')
+        codes.extend(int(code) for code in country_codes(GROUPS[group.lower()]) if not pd.isna(code))
+    return codes
+
+def _column(frame, name):
+    if name not in frame.columns:
+        raise QueryError(f'unknown indicator {name!r} (choose from {list(frame.columns)})')
+    return name
+
+# Rows for query parameters, each optional and combined with AND:
+#   countries=Japan,France  group=eu  where=Expenditure>5000 (repeatable)
+#   sort=-Years_Added (descending; comma-separated for ties)  top=5  columns=Country,Years_Added
+def query(frame, params):
+    codes = _selection(params)
+    if codes:
+        frame = frame[frame.index.isin(codes)]
+
+    for condition in params.get('where', []):
+        match = _CONDITION.match(condition)
+        if not match:
+            raise QueryError(f'cannot read condition {condition!r} (e.g. Expenditure>5000)')
+        name, operator, value = match.groups()
+        values = frame[_column(frame, name)]
+        if pd.api.types.is_numeric_dtype(values):
+            try:
+                value = float(value)
+            except ValueError:
+                raise QueryError(f'{name} is numeric, not {value!r}')
+            frame = frame[_OPERATORS[operator](values.to_numpy(dtype = float), value)]
+        else:
+            if operator not in ('=', '!='):
+                raise QueryError(f'{name} only compares with = or !=')
+            frame = frame[(values.astype(str) == value) == (operator == '=')]
+
+    keys = _names(params.get('sort', []))
+    if keys:
+        columns = [_column(frame, key.lstrip('-')) for key in keys]
+        frame = frame.sort_values(columns, ascending = [not key.startswith('-') for key in keys], na_position = 'last')
+
+    if params.get('top'):
+        try:
+            frame = frame.head(int(params['top'][-1]))
+        except ValueError:
+            raise QueryError(f"top must be a number, not {params['top'][-1]!r}")
+
+    columns = _names(params.get('columns', []))
+    if columns:
+        frame = frame[[_column(frame, column) for column in dict.fromkeys(['Country'] + columns)]]
+    return frame
+
+#### Country names for highlight= (names, aliases or ISO-3), None when not given ####
+def _highlight(frame, params):
+    if 'highlight' not in params:
+        return None
+    codes = _selection({'countries': params['highlight']})
+    return tuple(frame.loc[frame.index.isin(codes), 'Country'])
+
+def _records(frame):
+    return json.loads(json_ready(frame).to_json(orient = 'records', force_ascii = False))
+
+##############################
+############ HTTP ############
+##############################
+
+# GET endpoints, all JSON except charts:
+#   /                        indicators, countries, groups and charts available
+#   /query?...               rows matching the query (see query)
+#   /country/<name>          one country's row
+#   /chart/<chart>.<fmt>?... a chart of the query's rows (png, svg or pdf; dpi=, highlight=Japan,France)
+class _Handler(http.server.BaseHTTPRequestHandler):
+    store = None
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        params = urllib.parse.parse_qs(url.query)
+        parts = [urllib.parse.unquote(part) for part in url.path.strip('/').split('/') if part]
+        try:
+            frame = self.store.refresh()
+            if not parts:
+                return self._json(self._describe(frame))
+            if parts[0] == 'query' and len(parts) == 1:
+                rows = query(frame, params)
+                return self._json({'table': self.store.table, 'count': len(rows), 'rows': _records(rows)})
+            if parts[0] == 'country' and len(parts) == 2:
+                try:
+                    rows = query(frame, {'countries': [parts[1]]})
+                except QueryError as e:
+                    return self._error(404, str(e))
+                if not len(rows):
+                    return self._error(404, f'{parts[1]} is not in the results')
+                return self._json(_records(rows)[0])
+            if parts[0] == 'chart' and len(parts) == 2:
+                name, _, fmt = parts[1].partition('.')
+                fmt = fmt or 'png'
+                if fmt not in CONTENT_TYPES:
+                    raise QueryError(f'unknown chart format {fmt!r} (choose from {sorted(CONTENT_TYPES)})')
+                if chart_function(name) is None:
+                    return self._error(404, f'no chart {name!r}')
+                dpi = float(params['dpi'][-1]) if params.get('dpi') else None
+                rows, highlight = query(frame, params), _highlight(frame, params)
+                try:
+                    data = self.store.chart(name, rows, fmt, dpi, highlight)
+                except KeyError as e:
+                    raise QueryError(f'cannot draw {name} from these rows: no column {e}') from e
+                return self._send(200, CONTENT_TYPES[fmt], data)
+            return self._error(404, f'no endpoint {url.path!r}')
+        except ValueError as e:
+            return self._error(400, str(e))
+        except FileNotFoundError as e:
+            return self._error(503, str(e))
+
+    def _describe(self, frame):
+        from . import charts
+        return {
+            'table': self.store.table,
+            'indicators': {str(column): str(dtype) for column, dtype in frame.dtypes.items()},
+            'countries': list(frame['Country'].astype(str)),
+            'groups': sorted(GROUPS),
+            'charts': sorted(name for name in dir(charts) if name.startswith('chart_')),
+        }
+
+    def _json(self, value, status = 200):
+        self._send(status, 'application/json; charset=utf-8', json.dumps(value, ensure_ascii = False).encode('utf-8'))
+
+    def _error(self, status, message):
+        self._json({'error': message}, status)
+
+    def _send(self, status, content_type, body):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+# Serve the results exported to `directory` (where manifest.json is) on a
+# background thread; port 0 picks a free one. Returns the server and its base URL;
+# server.shutdown() stops it.
+def serve_results(directory, host = '127.0.0.1', port = 0, chart_cache = CHART_CACHE):
+    store = ResultStore(directory, chart_cache)
+    store.refresh()
+    handler = type('Handler', (_Handler,), {'store': store})
+    server = http.server.ThreadingHTTPServer((host, port), handler)
+    server.store = store
+    thread = threading.Thread(target = server.serve_forever, daemon = True)
+    thread.start()
+    return server, f'http://{host}:{server.server_address[1]}'
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(prog = 'python -m healthcare.service', description = 'Query the exported results over HTTP/JSON')
+    parser.add_argument('--results', default = '.', help = 'directory with manifest.json and the exported tables (default: current directory)')
+    parser.add_argument('--host', default = '127.0.0.1')
+    parser.add_argument('--port', type = int, default = 8000)
+    parser.add_argument('--chart-cache', type = int, default = CHART_CACHE, help = 'rendered charts kept in memory (default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    import matplotlib
+    matplotlib.use('Agg')
+    server, url = serve_results(args.results, args.host, args.port, args.chart_cache)
+    print(f'serving {os.path.abspath(args.results)} on {url}', file = sys.stderr)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == '__main__':
+    main()
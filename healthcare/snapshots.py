@@ -0,0 +1,54 @@
+import os
+import glob
+import importlib.util
+
+from .cache import DEFAULT_CACHE_DIR
+from .files import atomic_path, remove_stale
+
+##############################
+### Parsed-table snapshots ###
+##############################
+
+# Parsed and cleaned per-source frames (country codes matched, schema validated)
+# stored as Feather files named <source>-<key>.feather, where the key hashes the raw
+# HTML and the parsing and cleaning code (see sources.parse_source). A changed page
+# or an edited parser, country table or schema produces a new key, and saving it
+# removes the source's old files.
+class SnapshotStore:
+    def __init__(self, directory = None):
+        self.root = directory or DEFAULT_CACHE_DIR
+        self.enabled = importlib.util.find_spec('pyarrow') is not None
+
+    @property
+    def directory(self):
+        return os.path.join(self.root, 'tables')
+
+    def _path(self, source, key):
+        return os.path.join(self.directory, f'{source}-{key}.feather')
+
+    #### Memory-mapped read; returns None when there is no snapshot for this key ####
+    def load(self, source, key):
+        if not self.enabled:
+            return None
+        import pyarrow as pa
+        import pyarrow.feather as feather
+        try:
+            table = feather.read_table(self._path(source, key), memory_map = True)
+        except (FileNotFoundError, pa.ArrowInvalid):
+            return None
+        return table.to_pandas()
+
+    def save(self, source, key, frame):
+        if not self.enabled:
+            return
+        import pyarrow as pa
+        import pyarrow.feather as feather
+        os.makedirs(self.directory, exist_ok = True)
+        path = self._path(source, key)
+        with atomic_path(path) as tmp:
+            feather.write_feather(pa.Table.from_pandas(frame), tmp, compression = 'uncompressed')
+        remove_stale(self._path(source, '*'), path)
+
+    def clear(self):
+        for path in glob.glob(os.path.join(self.directory, '*.feather')):
+            os.remove(path)
@@ -0,0 +1,168 @@
+import os
+import json
+import functools
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from . import panel as _panel, tables as _tables
+from .countries import canonicalize, registered_count
+from .fetch import SOURCES as PAGES, DEFAULT_TIMEOUT, DEFAULT_RETRIES, fetch_page, fetch_pages, rebase_url
+from .fingerprints import hash_text, hash_code, hash_function, hash_module
+from .panel import to_long, year_column
+from .schemas import COUNTRY, CODE, YEAR, EXPENDITURE, LIFE_EXPECTANCY, DISPOSABLE_INCOME, OBESITY_RATE, Column, validate
+from .tables import extract_table
+
+# An indicator, declared rather than hand-coded:
+#
+# name     - stage and snapshot name
+# column   - the schema Column its values are checked against and stored as (name, dtype, unit, range)
+# url      - page holding the table, or
+# path     - a local .csv / .parquet file with the same layout
+# classes  - table selector: a subset of the table's classes, and/or
+# caption  - text in its caption
+# country  - column with the country names: header label or position
+# value    - column with the values: header label or position (on multi-row headers
+#            a label matches any header row)
+# by_year  - one column per year instead of `value`: the analysis year's column is
+#            the value, and every year column together gives the panel
+# dropna   - drop countries without a value
+# timeout  - (connect, read) seconds for fetching url
+# retries  - extra attempts after a connection error, timeout or 429/5xx
+Source = namedtuple('Source', ['name', 'column', 'url', 'path', 'classes', 'caption', 'country', 'value', 'by_year', 'dropna', 'timeout', 'retries'],
+                    defaults = [None, None, None, None, 'Country', None, False, False, DEFAULT_TIMEOUT, DEFAULT_RETRIES])
+
+class SourceError(ValueError):
+    pass
+
+##############################
+########## Registry ##########
+##############################
+
+REGISTRY = {}
+
+def register_source(source):
+    if (source.url is None) == (source.path is None):
+        raise SourceError(f'{source.name}: give exactly one of url and path')
+    if source.value is None and not source.by_year:
+        raise SourceError(f'{source.name}: give a value column or by_year')
+    REGISTRY[source.name] = source
+    return source
+
+register_source(Source('expenditure', EXPENDITURE, PAGES['expenditure'], classes = 'wikitable static-row-numbers sticky-table-col1', country = 'Location', by_year = True))
+register_source(Source('life_expectancy', LIFE_EXPECTANCY, PAGES['life_expectancy'], classes = 'wikitable static-row-numbers sticky-table-col1', country = 0, value = 1))
+register_source(Source('disposable_income', DISPOSABLE_INCOME, PAGES['disposable_income'], classes = 'wikitable static-row-numbers', country = 'Location', by_year = True))
+register_source(Source('obesity_rate', OBESITY_RATE, PAGES['obesity_rate'], classes = 'wikitable plainrowheaders', value = 'Percentage of adults with obesity (BMI≥30)', dropna = True))
+
+#### The built-in sources the analysis is made of ####
+CORE_SOURCES = tuple(REGISTRY)
+
+# Declarations from a JSON list, e.g.
+#   {"name": "smoking_rate", "column": "Smoking_Rate", "unit": "percent of adults", "low": 0, "high": 100,
+#    "url": "https://...", "classes": "wikitable", "country": "Country", "value": "2020"}
+# dtype defaults to float32; a relative path is taken from the JSON file's directory;
+# timeout is seconds or [connect, read].
+def load_registry(path):
+    with open(path, encoding = 'utf-8') as f:
+        specs = json.load(f)
+    sources = []
+    for spec in specs:
+        spec = dict(spec)
+        column = Column(spec.pop('column'), spec.pop('dtype', 'float32'), spec.pop('unit', None), spec.pop('low', None), spec.pop('high', None))
+        if isinstance(spec.get('timeout'), list):
+            spec['timeout'] = tuple(spec['timeout'])
+        if spec.get('path'):
+            spec['path'] = os.path.join(os.path.dirname(os.path.abspath(path)), spec['path'])
+        try:
+            sources.append(register_source(Source(column = column, **spec)))
+        except TypeError as e:
+            raise SourceError(f'{path}: {spec.get("name")}: {e}') from e
+    return sources
+
+def source_schema(source, panel = False):
+    return [COUNTRY, CODE] + ([YEAR] if panel else []) + [source.column]
+
+##############################
+########### Engine ###########
+##############################
+
+#### A column by header label (any header row) or position ####
+def _label(frame, key):
+    if isinstance(key, int):
+        return frame.columns[key]
+    if key in frame.columns:
+        return key
+    if isinstance(frame.columns, pd.MultiIndex):
+        for column in frame.columns:
+            if key in column:
+                return column
+    raise SourceError(f'no column {key!r} (columns: {list(frame.columns)})')
+
+# The source's table as Country, <column> (or Country, Year, <column> rows for the
+# panel), with values still as found; validation parses them.
+def select(source, frame, year = None, panel = False):
+    country = _label(frame, source.country)
+    if panel:
+        if not source.by_year:
+            raise SourceError(f'{source.name}: no year columns for a panel')
+        return to_long(frame.rename(columns = {country: 'Country'}), source.column.name)
+    value = year_column(frame, year) if source.by_year else _label(frame, source.value)
+    table = frame[[country, value]]
+    table.columns = ['Country', source.column.name]
+    return table
+
+def parse_page(source, page, year = None, panel = False):
+    return select(source, extract_table(page, classes = source.classes, caption = source.caption), year, panel)
+
+def read_file(source, year = None, panel = False):
+    read = pd.read_parquet if source.path.endswith('.parquet') else pd.read_csv
+    return select(source, read(source.path), year, panel)
+
+#### Country codes, schema check and the source's cleaning rules ####
+def clean(source, frame, panel = False):
+    frame = validate(canonicalize(frame), f'{source.name}_panel' if panel else source.name, source_schema(source, panel))
+    return frame.dropna() if source.dropna else frame
+
+# Code version of a snapshot: the engine plus table extraction (tables.py) and year
+# columns (panel.py), and everything clean() reaches (countries.py and its table,
+# schemas.py); an edit to any invalidates every snapshot. Recomputed when
+# register_countries adds units, since those change what canonicalize matches.
+@functools.lru_cache(maxsize = None)
+def _version(registered):
+    return hash_text(*(hash_function(func) for func in (_label, select, parse_page)), hash_module(_tables), hash_module(_panel), hash_code(clean))
+
+# parse_page and clean through the snapshot store, keyed by the page, the code
+# version, the declaration and the year, so an unchanged page skips parsing,
+# country matching and validation entirely.
+def parse_source(source, page, year = None, panel = False, store = None):
+    if store is None:
+        return clean(source, parse_page(source, page, year, panel), panel)
+    name = f'{source.name}_panel' if panel else source.name
+    key = hash_text(page, _version(registered_count()), repr(source), str(year), str(panel))
+    frame = store.load(name, key)
+    if frame is None:
+        frame = clean(source, parse_page(source, page, year, panel), panel)
+        store.save(name, key, frame)
+    return frame
+
+# One source, cleaned: fetched through `cache` (from `base_url` when given) unless
+# the page is passed in, or read from its local file.
+def load_source(source, page = None, year = None, panel = False, cache = None, base_url = None, store = None):
+    if source.path is not None:
+        return clean(source, read_file(source, year, panel), panel)
+    if page is None:
+        page = fetch_page(rebase_url(source.url, base_url), timeout = source.timeout, retries = source.retries, cache = cache)
+    return parse_source(source, page, year, panel, store)
+
+# Many sources at once: every page fetched in parallel over the shared pooled
+# session, then parsed and cleaned on a thread pool. Returns {name: frame}.
+def load_sources(sources = None, year = None, panel = False, cache = None, base_url = None, store = None, max_workers = None):
+    sources = list(REGISTRY.values()) if sources is None else list(sources)
+    web = {source.name: source.url for source in sources if source.path is None}
+    timeouts = {source.name: source.timeout for source in sources}
+    retries = {source.name: source.retries for source in sources}
+    pages = fetch_pages(web, base_url, timeouts, retries, cache = cache, max_workers = max_workers) if web else {}
+    with ThreadPoolExecutor(max_workers = max_workers) as pool:
+        futures = {source.name: pool.submit(load_source, source, pages.get(source.name), year, panel, store = store) for source in sources}
+    return {name: future.result() for name, future in futures.items()}
@@ -0,0 +1,296 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from .countries import country_codes
+from .workers import run_tasks, seeded_chunks
+
+#### The residuals the conclusions rest on and the (x, y) line each is measured from ####
+SWEEP_FITS = {
+    'Excess_Expenditure_as_Percent': ('Disposable_Income', 'Expenditure_As_Percent_of_Income'),
+    'Years_Added': ('Obesity_Rate', 'Life_Expectancy'),
+}
+
+#### Regions as ISO-3 codes; countries outside every region are never dropped as part of one ####
+REGIONS = {
+    'europe': ['ALB', 'AND', 'AUT', 'BEL', 'BGR', 'BIH', 'BLR', 'CHE', 'CYP', 'CZE', 'DEU', 'DNK', 'ESP', 'EST', 'FIN', 'FRA', 'GBR',
+               'GRC', 'HRV', 'HUN', 'IRL', 'ISL', 'ITA', 'LIE', 'LTU', 'LUX', 'LVA', 'MCO', 'MDA', 'MKD', 'MLT', 'MNE', 'NLD', 'NOR',
+               'POL', 'PRT', 'ROU', 'RUS', 'SMR', 'SRB', 'SVK', 'SVN', 'SWE', 'UKR'],
+    'americas': ['ARG', 'ATG', 'BHS', 'BLZ', 'BOL', 'BRA', 'BRB', 'CAN', 'CHL', 'COL', 'CRI', 'CUB', 'DMA', 'DOM', 'ECU', 'GRD', 'GTM',
+                 'GUY', 'HND', 'HTI', 'JAM', 'KNA', 'LCA', 'MEX', 'NIC', 'PAN', 'PER', 'PRY', 'SLV', 'SUR', 'TTO', 'URY', 'USA', 'VCT',
+                 'VEN'],
+    'asia_pacific': ['AUS', 'BGD', 'BRN', 'BTN', 'CHN', 'FJI', 'IDN', 'IND', 'JPN', 'KHM', 'KOR', 'LAO', 'LKA', 'MDV', 'MMR', 'MNG',
+                     'MYS', 'NPL', 'NZL', 'PAK', 'PHL', 'PNG', 'PRK', 'SGP', 'THA', 'TLS', 'TWN', 'VNM', 'WSM', 'TON', 'VUT', 'SLB'],
+    'middle_east_central_asia': ['AFG', 'ARE', 'ARM', 'AZE', 'BHR', 'GEO', 'IRN', 'IRQ', 'ISR', 'JOR', 'KAZ', 'KGZ', 'KWT', 'LBN', 'OMN',
+                                 'QAT', 'SAU', 'SYR', 'TJK', 'TKM', 'TUR', 'UZB', 'YEM'],
+    'africa': ['AGO', 'BDI', 'BEN', 'BFA', 'BWA', 'CAF', 'CIV', 'CMR', 'COD', 'COG', 'COM', 'CPV', 'DJI', 'DZA', 'EGY', 'ERI', 'ETH',
+               'GAB', 'GHA', 'GIN', 'GMB', 'GNB', 'GNQ', 'KEN', 'LBR', 'LBY', 'LSO', 'MAR', 'MDG', 'MLI', 'MOZ', 'MRT', 'MUS', 'MWI',
+               'NAM', 'NER', 'NGA', 'RWA', 'SDN', 'SEN', 'SLE', 'SOM', 'SSD', 'STP', 'SWZ', 'SYC', 'TCD', 'TGO', 'TUN', 'TZA', 'UGA',
+               'ZAF', 'ZMB', 'ZWE'],
+}
+
+DEFAULT_LEAVE_OUT = (1, 2, 3)
+DEFAULT_SAMPLES = 10000
+DEFAULT_FRACTION = 0.8
+DEFAULT_CHUNK = 2000
+
+#### A country counts as top (bottom) in a subset when it ranks within this many of the highest (lowest) residuals ####
+DEFAULT_TOP = 5
+
+#### Fewest countries a subset may keep for its line and ranks to mean anything ####
+MIN_COUNTRIES = 3
+
+##############################
+#### Sufficient statistics ###
+##############################
+
+# Each country's contribution to the five sums a line fit needs -- n, sum x, sum y,
+# sum x^2, sum xy -- per fit: an (n, fits, 5) array, zero where a value is missing.
+# Values are centred on the full-sample means first, so the sums stay small and the
+# slope formula below loses no precision to cancellation. A subset's sums are the
+# sum of its countries' rows, or the total minus the rows it leaves out: the fit
+# itself costs O(k) additions for leave-k-out, whatever the number of countries.
+def _contributions(x, y):
+    present = np.isfinite(x) & np.isfinite(y)
+    with np.errstate(invalid = 'ignore'):
+        x = np.where(present, x - np.nanmean(np.where(present, x, np.nan), axis = 0), 0.0)
+        y = np.where(present, y - np.nanmean(np.where(present, y, np.nan), axis = 0), 0.0)
+    return np.stack([present.astype(float), x, y, x * x, x * y], axis = -1), x, y, present
+
+#### Slopes and intercepts from (..., 5) sums ####
+def _lines(sums):
+    n, sx, sy, sxx, sxy = np.moveaxis(sums, -1, 0)
+    with np.errstate(invalid = 'ignore', divide = 'ignore'):
+        slope = (n * sxy - sx * sy) / (n * sxx - sx * sx)
+        return slope, (sy - slope * sx) / n
+
+#### 1-based rank of each included country's residual, highest first, along the last axis ####
+def _ranks(residuals, included):
+    order = np.argsort(np.where(included, -residuals, np.inf), axis = -1)
+    ranks = np.empty(residuals.shape, dtype = np.int64)
+    np.put_along_axis(ranks, order, np.broadcast_to(np.arange(1, residuals.shape[-1] + 1), residuals.shape), axis = -1)
+    return ranks
+
+##############################
+########## Subsets ###########
+##############################
+
+# A chunk of subsets to one (subsets, fits, 5) array of sums and an (subsets, n)
+# inclusion mask. Designs:
+#   ('leave_out', combos)         drop each row of `combos` (country indices)
+#   ('random', seed, size, keep)  `size` draws of `keep` countries without replacement
+#   ('mask', masks)               explicit (subsets, n) boolean masks, e.g. regions
+def _subsets(contributions, design):
+    n = contributions.shape[0]
+    kind = design[0]
+    if kind == 'leave_out':
+        combos = design[1]
+        sums = contributions.sum(axis = 0) - contributions[combos].sum(axis = 1)
+        mask = np.ones((len(combos), n), dtype = bool)
+        np.put_along_axis(mask, combos, False, axis = 1)
+        return sums, mask
+    if kind == 'random':
+        _, seed, size, keep = design
+        rows = np.argsort(np.random.default_rng(seed).random((size, n)), axis = 1)[:, :keep]
+        mask = np.zeros((size, n), dtype = bool)
+        np.put_along_axis(mask, rows, True, axis = 1)
+        return contributions[rows].sum(axis = 1), mask
+    masks = design[1]
+    return np.einsum('sn,nfk->sfk', masks.astype(float), contributions), masks
+
+# Refit every line of a chunk and fold the results into running totals, so only
+# per-country and per-design aggregates leave the worker, never one row per subset:
+# a histogram of each country's ranks (for exact quantiles), residual moments and
+# extremes, how often the residual keeps its full-sample sign, and per fit the
+# slope's moments and the Spearman correlation of each subset's ranking with the
+# full-sample ranking of the same countries.
+def _sweep_chunk(contributions, x, y, present, full_residuals, full_order, design, top):
+    sums, mask = _subsets(contributions, design)
+    slope, intercept = _lines(sums)
+    included = mask[:, None, :] & present.T[None, :, :]
+    size = included.sum(axis = -1)
+    included &= (np.isfinite(slope) & (size >= MIN_COUNTRIES))[..., None]
+    size = included.sum(axis = -1)
+    fitted = size > 0
+
+    residuals = y.T[None] - intercept[..., None] - slope[..., None] * x.T[None]
+    ranks = _ranks(residuals, included)
+
+    #### Full-sample ranks among the subset's countries: a running count along the full-sample order, no sort ####
+    order = np.broadcast_to(full_order[None], residuals.shape)
+    full_ranks = np.empty(residuals.shape, dtype = np.int64)
+    np.put_along_axis(full_ranks, order, np.take_along_axis(included, order, axis = -1).cumsum(axis = -1), axis = -1)
+
+    subsets, fits, n = residuals.shape
+    cells = (np.arange(fits)[:, None] * n + np.arange(n)[None, :]) * n
+    histogram = np.bincount((cells[None] + ranks - 1)[included], minlength = fits * n * n).reshape(fits, n, n)
+
+    kept = np.where(included, residuals, 0.0)
+    with np.errstate(invalid = 'ignore', divide = 'ignore'):
+        spearman = 1 - 6 * (np.where(included, ranks - full_ranks, 0) ** 2).sum(axis = -1) / (size * (size ** 2 - 1))
+    slope = np.where(fitted, slope, 0.0)
+    spearman = np.where(fitted, spearman, 0.0)
+    return {
+        'histogram': histogram,
+        'count': included.sum(axis = 0),
+        'residual_sum': kept.sum(axis = 0),
+        'residual_sq': (kept ** 2).sum(axis = 0),
+        'residual_min': np.where(included, residuals, np.inf).min(axis = 0),
+        'residual_max': np.where(included, residuals, -np.inf).max(axis = 0),
+        'same_sign': (included & (np.sign(residuals) == np.sign(full_residuals))).sum(axis = 0),
+        'top': (included & (ranks <= top)).sum(axis = 0),
+        'bottom': (included & (ranks > size[..., None] - top)).sum(axis = 0),
+        'subsets': fitted.sum(axis = 0),
+        'size_sum': size.sum(axis = 0),
+        'slope_sum': slope.sum(axis = 0),
+        'slope_sq': (slope ** 2).sum(axis = 0),
+        'slope_min': np.where(fitted, slope, np.inf).min(axis = 0),
+        'slope_max': np.where(fitted, slope, -np.inf).max(axis = 0),
+        'spearman_sum': spearman.sum(axis = 0),
+        'spearman_min': np.where(fitted, spearman, np.inf).min(axis = 0),
+    }
+
+def _merge(totals, chunk):
+    if totals is None:
+        return chunk
+    for key, value in chunk.items():
+        totals[key] = np.minimum(totals[key], value) if key.endswith('_min') else np.maximum(totals[key], value) if key.endswith('_max') else totals[key] + value
+    return totals
+
+#### Leave-k-out combinations of n countries, `chunk_size` at a time ####
+def _leave_out_chunks(n, k, chunk_size):
+    combos = itertools.combinations(range(n), k)
+    while True:
+        chunk = np.array(list(itertools.islice(combos, chunk_size)), dtype = np.int64).reshape(-1, k)
+        if not len(chunk):
+            return
+        yield chunk
+
+def _region_masks(codes, regions):
+    masks = {}
+    for region, members in regions.items():
+        inside = np.isin(codes, [code for code in country_codes(members) if not pd.isna(code)])
+        if inside.any():
+            masks[f'only_{region}'] = inside
+            masks[f'without_{region}'] = ~inside
+    return masks
+
+##############################
+########### Sweep ############
+##############################
+
+#### Exact quantile of each histogram row (counts per rank 1..n) ####
+def _quantile(histogram, q):
+    cumulative = histogram.cumsum(axis = -1)
+    total = cumulative[..., -1:]
+    with np.errstate(invalid = 'ignore'):
+        return np.where(total[..., 0] > 0, (cumulative < np.maximum(np.ceil(q * total), 1)).sum(axis = -1) + 1.0, np.nan)
+
+# Refit the lines behind `fits` (default: Excess_Expenditure_as_Percent and
+# Years_Added) over many subsets of the frame's countries and measure how much each
+# country's residual and rank move. Designs, each reported on its own:
+#   leave_<k>_out   every way of dropping k countries, for each k in leave_out
+#   random_<pct>    `samples` random subsets keeping `fraction` of the countries
+#   only_<region>   one region alone, and without_<region> all the others (REGIONS)
+# Subsets keeping fewer than MIN_COUNTRIES countries are skipped. Ranks are 1 for the
+# highest residual among the countries in the subset. Chunks run in worker
+# processes and random chunks are seeded from `seed` alone, so the result does not
+# depend on the worker count.
+#
+# Returns {'sweep_countries': one row per (fit, country), 'sweep_designs': one row
+# per (design, fit)}.
+def sensitivity_sweep(frame, fits = None, leave_out = DEFAULT_LEAVE_OUT, samples = DEFAULT_SAMPLES, fraction = DEFAULT_FRACTION,
+                      regions = None, seed = 0, top = DEFAULT_TOP, workers = None, chunk_size = DEFAULT_CHUNK):
+    fits = SWEEP_FITS if fits is None else fits
+    regions = REGIONS if regions is None else regions
+    names = list(fits)
+    x = frame[[fits[name][0] for name in names]].to_numpy(dtype = float)
+    y = frame[[fits[name][1] for name in names]].to_numpy(dtype = float)
+    contributions, x, y, present = _contributions(x, y)
+    n = len(frame)
+
+    slope, intercept = _lines(contributions.sum(axis = 0))
+    full_residuals = np.where(present.T, y.T - intercept[:, None] - slope[:, None] * x.T, np.nan)
+
+    designs = {}
+    for k in leave_out:
+        if 0 < k <= n - MIN_COUNTRIES:
+            designs[f'leave_{k}_out'] = [('leave_out', combos) for combos in _leave_out_chunks(n, k, chunk_size)]
+    keep = int(round(fraction * n))
+    if samples and MIN_COUNTRIES <= keep <= n:
+        designs[f'random_{round(fraction * 100)}'] = [('random', chunk_seed, size, keep) for chunk_seed, size in seeded_chunks(samples, chunk_size, seed)]
+    for design, mask in _region_masks(frame['Code'].to_numpy(), regions).items():
+        designs[design] = [('mask', mask[None, :])]
+
+    tasks = [(design, chunk) for design, chunks in designs.items() for chunk in chunks]
+    args = (contributions, x, y, present, full_residuals, np.argsort(np.where(present.T, -full_residuals, np.inf), axis = -1))
+    results = run_tasks(_sweep_chunk, [(*args, chunk, top) for _, chunk in tasks], workers)
+
+    per_design = {}
+    for (design, _), result in zip(tasks, results):
+        per_design[design] = _merge(per_design.get(design), result)
+    return {
+        'sweep_countries': _country_table(frame, names, full_residuals, per_design, top),
+        'sweep_designs': _design_table(names, slope, per_design),
+    }
+
+def _country_table(frame, names, full_residuals, per_design, top):
+    totals = None
+    for result in per_design.values():
+        totals = _merge(totals, {key: value.copy() for key, value in result.items()})
+    histogram = totals['histogram']
+    count = totals['count']
+    full_ranks = np.where(np.isfinite(full_residuals), _ranks(np.nan_to_num(full_residuals), np.isfinite(full_residuals)), 0)
+
+    with np.errstate(invalid = 'ignore', divide = 'ignore'):
+        rank = np.arange(1, histogram.shape[-1] + 1)
+        rank_mean = (histogram * rank).sum(axis = -1) / count
+        rank_sd = np.sqrt(np.maximum((histogram * rank ** 2).sum(axis = -1) / count - rank_mean ** 2, 0))
+        residual_mean = totals['residual_sum'] / count
+        residual_sd = np.sqrt(np.maximum(totals['residual_sq'] / count - residual_mean ** 2, 0))
+        table = pd.DataFrame({
+            'fit': np.repeat(names, len(frame)),
+            'Country': np.tile(frame['Country'].to_numpy(dtype = object), len(names)),
+            'Code': np.tile(frame['Code'].to_numpy(), len(names)),
+            'residual': full_residuals.ravel(),
+            'rank': full_ranks.ravel(),
+            'subsets': count.ravel(),
+            'rank_mean': rank_mean.ravel(),
+            'rank_sd': rank_sd.ravel(),
+            'rank_p05': _quantile(histogram, 0.05).ravel(),
+            'rank_median': _quantile(histogram, 0.5).ravel(),
+            'rank_p95': _quantile(histogram, 0.95).ravel(),
+            'rank_min': np.where(count > 0, (histogram > 0).argmax(axis = -1) + 1, 0).ravel(),
+            'rank_max': np.where(count > 0, histogram.shape[-1] - (histogram[..., ::-1] > 0).argmax(axis = -1), 0).ravel(),
+            f'top_{top}_share': (totals['top'] / count).ravel(),
+            f'bottom_{top}_share': (totals['bottom'] / count).ravel(),
+            'residual_mean': residual_mean.ravel(),
+            'residual_sd': residual_sd.ravel(),
+            'residual_min': np.where(count > 0, totals['residual_min'], np.nan).ravel(),
+            'residual_max': np.where(count > 0, totals['residual_max'], np.nan).ravel(),
+            'sign_share': (totals['same_sign'] / count).ravel(),
+        })
+    table = table[np.isfinite(full_residuals).ravel()]
+    return table.sort_values(['fit', 'rank'], ignore_index = True)
+
+def _design_table(names, full_slopes, per_design):
+    rows = []
+    for design, result in per_design.items():
+        subsets = result['subsets']
+        with np.errstate(invalid = 'ignore', divide = 'ignore'):
+            slope_mean = result['slope_sum'] / subsets
+            rows.append(pd.DataFrame({
+                'design': design,
+                'fit': names,
+                'subsets': subsets,
+                'countries': result['size_sum'] / subsets,
+                'slope': full_slopes,
+                'slope_mean': slope_mean,
+                'slope_sd': np.sqrt(np.maximum(result['slope_sq'] / subsets - slope_mean ** 2, 0)),
+                'slope_min': np.where(subsets > 0, result['slope_min'], np.nan),
+                'slope_max': np.where(subsets > 0, result['slope_max'], np.nan),
+                'spearman_mean': result['spearman_sum'] / subsets,
+                'spearman_min': np.where(subsets > 0, result['spearman_min'], np.nan),
+            }))
+    return pd.concat(rows, ignore_index = True)
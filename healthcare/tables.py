@@ -0,0 +1,130 @@
+import io
+import re
+
+from lxml import etree
+from pandas.io.parsers import TextParser
+
+from .tracing import traced
+
+_WHITESPACE = re.compile(r'[\r\n]+|\s{2,}')
+_HIDDEN = re.compile(r'display:\s*none')
+
+class TableNotFound(LookupError):
+    pass
+
+##############################
+###### Table extraction ######
+##############################
+
+# Streams the page through lxml's incremental parser, discarding everything outside
+# tables as it goes, and stops at the end of the first table that matches. Tables are
+# matched on a subset of their classes and/or their caption text, so Wikipedia adding
+# or reordering a class does not lose the table.
+@traced('parse')
+def extract_table(page, classes = None, caption = None, thousands = ','):
+    wanted = set(classes.split()) if isinstance(classes, str) else set(classes or ())
+    source = io.BytesIO(page.encode('utf-8') if isinstance(page, str) else page)
+
+    depth = 0
+    for event, element in etree.iterparse(source, events = ('start', 'end'), html = True, encoding = 'utf-8', recover = True):
+        if element.tag == 'table':
+            if event == 'start':
+                depth += 1
+                continue
+            depth -= 1
+            if _matches(element, wanted, caption):
+                return table_to_frame(element, thousands = thousands)
+        if event == 'end' and depth == 0:
+            element.clear(keep_tail = False)
+            parent = element.getparent()
+            while parent is not None and element.getprevious() is not None:
+                del parent[0]
+
+    raise TableNotFound(f'no table with classes {sorted(wanted)} and caption {caption!r}')
+
+def _matches(table, wanted, caption):
+    if not wanted <= set((table.get('class') or '').split()):
+        return False
+    if caption is not None:
+        found = table.find('caption')
+        return found is not None and caption.lower() in _text(found).lower()
+    return True
+
+def _text(element):
+    return _WHITESPACE.sub(' ', ''.join(element.itertext())).strip()
+
+def _visible(element):
+    return not _HIDDEN.search(element.get('style') or '')
+
+#### Drop display:none elements (sort keys, hidden footnotes) like read_html does ####
+def _strip_hidden(table):
+    for element in list(table.iter()):
+        if element is table or _visible(element):
+            continue
+        parent, previous = element.getparent(), element.getprevious()
+        if element.tail:
+            if previous is not None:
+                previous.tail = (previous.tail or '') + element.tail
+            else:
+                parent.text = (parent.text or '') + element.tail
+        parent.remove(element)
+
+def _rows(table):
+    head, body, foot = [], [], []
+    for section in table:
+        if section.tag == 'tr':
+            body.append(section)
+        elif section.tag in ('thead', 'tbody', 'tfoot'):
+            rows = [tr for tr in section if tr.tag == 'tr']
+            {'thead': head, 'tbody': body, 'tfoot': foot}[section.tag].extend(rows)
+    if not head:
+        while body and all(cell.tag == 'th' for cell in _cells(body[0])):
+            head.append(body.pop(0))
+    return head, body, foot
+
+def _cells(tr):
+    return [cell for cell in tr if cell.tag in ('th', 'td')]
+
+#### Expand rowspan/colspan into a grid of cell texts, as read_html does ####
+def _expand(rows, pending = None):
+    grid = []
+    pending = list(pending or [])
+    for tr in rows:
+        texts, carried = [], []
+        for cell in _cells(tr):
+            while pending and pending[0][0] <= len(texts):
+                column, text, remaining = pending.pop(0)
+                texts.append(text)
+                if remaining > 1:
+                    carried.append((column, text, remaining - 1))
+            text = _text(cell)
+            rowspan = int(cell.get('rowspan') or 1)
+            for _ in range(int(cell.get('colspan') or 1)):
+                if rowspan > 1:
+                    carried.append((len(texts), text, rowspan - 1))
+                texts.append(text)
+        for column, text, remaining in pending:
+            texts.append(text)
+            if remaining > 1:
+                carried.append((column, text, remaining - 1))
+        grid.append(texts)
+        pending = carried
+    return grid, pending
+
+#### Build the DataFrame straight from the parsed table element ####
+def table_to_frame(table, thousands = ','):
+    _strip_hidden(table)
+    head, body, foot = _rows(table)
+    head, pending = _expand(head)
+    body, pending = _expand(body, pending)
+    foot, _ = _expand(foot, pending)
+
+    header = None
+    if head:
+        header = 0 if len(head) == 1 else [i for i, row in enumerate(head) if any(row)]
+    data = head + body + foot
+    width = max((len(row) for row in data), default = 0)
+    data = [row + [''] * (width - len(row)) for row in data]
+
+    with TextParser(data, header = header, thousands = thousands) as parser:
+        return parser.read()
@@ -0,0 +1,195 @@
+import os
+import re
+import json
+import time
+import cProfile
+import functools
+import threading
+import contextlib
+import tracemalloc
+
+from .files import atomic_path
+
+##############################
+########### Tracer ###########
+##############################
+
+#### The tracer spans are recorded into; None (the default) makes traced() a plain call ####
+_active = None
+
+# One run's spans: wall time, CPU time of the calling thread, peak traced memory
+# above the span's starting point and the rows going in and out, plus each span's
+# parent so nested steps (stage -> loader -> parse) read as a tree.
+#
+# Peak memory comes from tracemalloc, which is process-wide: spans running at the
+# same time on other threads count each other's allocations.
+# profile_dir - also run each outermost span on a thread under cProfile and dump
+#               its stats to <profile_dir>/<span>.prof (pstats / snakeviz format)
+class Tracer:
+    def __init__(self, memory = True, profile_dir = None):
+        self.memory = memory
+        self.profile_dir = profile_dir
+        self.spans = []
+        self.started_at = None
+        self.seconds = None
+        self._open = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._ids = 0
+
+    #### Fold the peak since the last reset into every open span, then start a new interval ####
+    def _fold(self):
+        current, peak = tracemalloc.get_traced_memory()
+        for span in self._open:
+            span['peak'] = max(span['peak'], peak)
+        tracemalloc.reset_peak()
+        return current
+
+    def _stack(self):
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    @contextlib.contextmanager
+    def span(self, name, kind = 'step', rows_in = None):
+        stack = self._stack()
+        with self._lock:
+            self._ids += 1
+            record = {'id': self._ids, 'name': name, 'kind': kind, 'parent': stack[-1]['id'] if stack else None,
+                      'thread': threading.current_thread().name, 'rows_in': rows_in, 'rows_out': None}
+            state = {'peak': 0, 'base': self._fold() if self.memory else 0}
+            self._open.append(state)
+        profiler = None
+        if self.profile_dir and not stack:
+            profiler = cProfile.Profile()
+        stack.append(record)
+
+        start, cpu = time.perf_counter(), time.thread_time()
+        if profiler:
+            profiler.enable()
+        try:
+            yield record
+        finally:
+            if profiler:
+                profiler.disable()
+            record['seconds'] = time.perf_counter() - start
+            record['cpu_seconds'] = time.thread_time() - cpu
+            stack.pop()
+            with self._lock:
+                if self.memory:
+                    self._fold()
+                self._open.remove(state)
+                record['peak_bytes'] = max(state['peak'] - state['base'], 0) if self.memory else None
+                self.spans.append(record)
+            if profiler:
+                record['profile'] = self._dump(profiler, name)
+
+    #### Another tracer's spans (e.g. from a worker process), renumbered, its roots under the current span ####
+    def add(self, records):
+        stack = self._stack()
+        ids = {None: stack[-1]['id'] if stack else None}
+        with self._lock:
+            for record in sorted(records, key = lambda record: record['id']):
+                self._ids += 1
+                ids[record['id']] = self._ids
+            self.spans.extend(dict(record, id = ids[record['id']], parent = ids[record['parent']]) for record in records)
+
+    def _dump(self, profiler, name):
+        os.makedirs(self.profile_dir, exist_ok = True)
+        stem = re.sub(r'[^\w.-]+', '_', name)
+        #### Claim the first free name, so repeated spans (and worker processes) never overwrite each other ####
+        n = 1
+        while True:
+            path = os.path.join(self.profile_dir, f'{stem}.prof' if n == 1 else f'{stem}-{n}.prof')
+            try:
+                os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                break
+            except FileExistsError:
+                n += 1
+        profiler.dump_stats(path)
+        return path
+
+#### Make `tracer` the active one for the duration of the block ####
+@contextlib.contextmanager
+def tracing(tracer = None):
+    global _active
+    tracer = tracer or Tracer()
+    previous, _active = _active, tracer
+    started = tracer.memory and not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    tracer.started_at, start = time.time(), time.perf_counter()
+    try:
+        yield tracer
+    finally:
+        tracer.seconds = time.perf_counter() - start
+        _active = previous
+        if started:
+            tracemalloc.stop()
+
+def active():
+    return _active
+
+#### Rows of a frame (or frames) passing through a span; None for anything else ####
+def count_rows(*values):
+    import pandas as pd
+    rows = [len(value) for value in values if isinstance(value, (pd.DataFrame, pd.Series))]
+    return sum(rows) if rows else None
+
+# Decorate a step so each call is a span of the active tracer, named after the
+# function, with the rows of its frame arguments and of its result. Without an
+# active tracer the call goes straight through.
+def traced(kind = 'step', name = None):
+    def decorate(func):
+        label = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            tracer = _active
+            if tracer is None:
+                return func(*args, **kwargs)
+            with tracer.span(label, kind, count_rows(*args, *kwargs.values())) as record:
+                result = func(*args, **kwargs)
+                record['rows_out'] = count_rows(result)
+            return result
+        return wrapper
+    return decorate
+
+##############################
+########### Report ###########
+##############################
+
+# Spans grouped by kind and name: calls, total wall and CPU time, the largest peak
+# and the rows of the last call, slowest first.
+def summary(tracer):
+    groups = {}
+    for span in tracer.spans:
+        group = groups.setdefault((span['kind'], span['name']), {'kind': span['kind'], 'name': span['name'], 'calls': 0, 'seconds': 0.0,
+                                                                 'cpu_seconds': 0.0, 'peak_bytes': None, 'rows_in': None, 'rows_out': None})
+        group['calls'] += 1
+        group['seconds'] += span['seconds']
+        group['cpu_seconds'] += span['cpu_seconds']
+        if span.get('peak_bytes') is not None:
+            group['peak_bytes'] = max(group['peak_bytes'] or 0, span['peak_bytes'])
+        group['rows_in'], group['rows_out'] = span.get('rows_in'), span.get('rows_out')
+    return sorted(groups.values(), key = lambda group: -group['seconds'])
+
+def summary_table(tracer):
+    def cell(value, scale = 1, digits = 1):
+        return '-' if value is None else f'{value * scale:.{digits}f}'
+    lines = [f"{'kind':<8} {'name':<48} {'calls':>5} {'wall ms':>9} {'cpu ms':>9} {'peak MiB':>9} {'rows in':>8} {'rows out':>8}"]
+    for group in summary(tracer):
+        lines.append(f"{group['kind']:<8} {group['name']:<48} {group['calls']:>5} {cell(group['seconds'], 1000):>9} {cell(group['cpu_seconds'], 1000):>9} "
+                     f"{cell(group['peak_bytes'], 1 / 2 ** 20):>9} {cell(group['rows_in'], digits = 0):>8} {cell(group['rows_out'], digits = 0):>8}")
+    lines.append(f"{'run':<8} {'total':<48} {'':>5} {cell(tracer.seconds, 1000):>9}")
+    return '\n'.join(lines)
+
+def report(tracer):
+    return {'started_at': tracer.started_at, 'seconds': tracer.seconds, 'pid': os.getpid(), 'summary': summary(tracer), 'spans': tracer.spans}
+
+#### The JSON report, written to a temporary name and renamed ####
+def write_report(tracer, path):
+    with atomic_path(path) as tmp:
+        with open(tmp, 'w', encoding = 'utf-8') as f:
+            json.dump(report(tracer), f, indent = 2, default = str)
+    return path
@@ -0,0 +1,34 @@
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+##############################
+####### Process pools ########
+##############################
+
+#### forkserver where the platform has it, else spawn: never fork a process that runs threads ####
+def process_context():
+    return multiprocessing.get_context('forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn')
+
+#### Processes for `jobs` jobs: the request, else one per CPU, never more than the jobs ####
+def worker_count(workers, jobs):
+    return min(workers or os.cpu_count() or 1, jobs)
+
+# `total` random draws split into (seed, size) chunks of at most chunk_size, each
+# chunk seeded from `seed` alone, so results do not depend on the worker count.
+def seeded_chunks(total, chunk_size, seed):
+    sizes = [chunk_size] * (total // chunk_size) + ([total % chunk_size] if total % chunk_size else [])
+    return list(zip(np.random.SeedSequence(seed).spawn(len(sizes)), sizes))
+
+# func(*args) for every args tuple in tasks, results in task order: in this process
+# when one worker is enough, else on a process pool (initializer runs once per worker).
+def run_tasks(func, tasks, workers = None, initializer = None):
+    tasks = list(tasks)
+    workers = worker_count(workers, len(tasks))
+    if workers <= 1:
+        return [func(*args) for args in tasks]
+    with ProcessPoolExecutor(max_workers = workers, mp_context = process_context(), initializer = initializer) as pool:
+        futures = [pool.submit(func, *args) for args in tasks]
+        return [future.result() for future in futures]